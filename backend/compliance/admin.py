@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import HuntingZone, AmmunitionPurchase, ComplianceViolation, HunterLicense
+from .models import HuntingZone, AmmunitionPurchase, AmmunitionBalance, ComplianceViolation, HunterLicense
 
 @admin.register(HuntingZone)
 class HuntingZoneAdmin(admin.ModelAdmin):
@@ -15,14 +15,16 @@ class HuntingZoneAdmin(admin.ModelAdmin):
         ('Geographic Boundaries', {
             'fields': (
                 ('center_latitude', 'center_longitude'),
-                'radius_km'
+                'radius_km',
+                'boundary'
             )
         }),
         ('Time Restrictions', {
             'fields': (
                 ('season_start', 'season_end'),
                 ('daily_start_time', 'daily_end_time'),
-                'allowed_weekdays'
+                'allowed_weekdays',
+                'timezone'
             )
         }),
     )
@@ -39,23 +41,33 @@ class AmmunitionPurchaseAdmin(admin.ModelAdmin):
         return obj.remaining_quantity
     remaining_quantity_display.short_description = 'Remaining'
 
+@admin.register(AmmunitionBalance)
+class AmmunitionBalanceAdmin(admin.ModelAdmin):
+    list_display = ('hunter', 'caliber', 'purchased', 'fired', 'remaining')
+    search_fields = ('hunter__name', 'caliber')
+    ordering = ('hunter', 'caliber')
+    readonly_fields = ('hunter', 'caliber', 'purchased', 'fired')
+
 @admin.register(ComplianceViolation)
 class ComplianceViolationAdmin(admin.ModelAdmin):
-    list_display = ('hunter', 'violation_type', 'severity', 'detected_at', 'resolved')
+    list_display = ('hunter', 'violation_type', 'severity', 'detected_at', 'hit_count', 'last_seen_at', 'resolved')
     list_filter = ('violation_type', 'severity', 'resolved', 'detected_at')
     search_fields = ('hunter__name', 'description')
     ordering = ('-detected_at',)
-    readonly_fields = ('detected_at',)
+    readonly_fields = ('detected_at', 'hit_count', 'last_seen_at')
     
     fieldsets = (
         ('Violation Details', {
             'fields': ('hunter', 'violation_type', 'severity', 'description')
         }),
+        ('Occurrences', {
+            'fields': ('hit_count', 'last_seen_at')
+        }),
         ('Resolution', {
             'fields': ('resolved', 'notes')
         }),
         ('Evidence', {
-            'fields': ('evidence_data',),
+            'fields': ('evidence_data', 'recent_evidence'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
@@ -0,0 +1,148 @@
+"""
+Materialized ammunition balances
+
+Every purchase and shot adjusts the hunter's AmmunitionBalance rows with a
+single ``UPDATE ... SET fired = fired + n`` so concurrent writers never
+lose increments, and the AMMO_EXCESS check reads one row instead of
+counting the hunter's whole shot and purchase history.
+
+Compliance runs after commit in a background queue, so the balance a shot
+is judged by is taken when it is recorded: the hunter's row is read back
+after the increment and each shot's (purchased, fired) is remembered in
+memory per shot id, the way ``daily_counts`` keeps per-shot daily counts.
+Purchases and shots that arrive before the evaluator gets to it do not
+change its result.
+"""
+import threading
+from collections import OrderedDict
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from hunters.models import Gun, Shot
+from .models import AmmunitionBalance, AmmunitionPurchase
+
+ALL_CALIBERS = ''
+
+# Shot id -> hunter's (purchased, fired) across all calibers including that shot
+MAX_REMEMBERED_SHOTS = 100000
+_snapshot_lock = threading.Lock()
+_by_shot = OrderedDict()
+
+
+def normalize_caliber(caliber):
+    """Purchases and guns spell calibers by hand; compare them loosely"""
+    return (caliber or '').strip().lower()
+
+
+def apply_delta(hunter_id, caliber, purchased=0, fired=0):
+    """
+    Atomically add to the hunter's per-caliber and all-calibers balances;
+    returns the updated all-calibers (purchased, fired)
+    """
+    calibers = {ALL_CALIBERS, normalize_caliber(caliber)}
+    balances = AmmunitionBalance.objects.filter(hunter_id=hunter_id, caliber__in=calibers)
+    delta = {'purchased': F('purchased') + purchased, 'fired': F('fired') + fired}
+    # The updated rows stay locked until commit, so this reads our own totals
+    totals = balances.filter(caliber=ALL_CALIBERS).values_list('purchased', 'fired')
+
+    with transaction.atomic():
+        if balances.update(**delta) == len(calibers):
+            return totals.get()
+        # First purchase or shot in this caliber: undo the partial update,
+        # create the missing rows and apply the delta to all of them
+        transaction.set_rollback(True)
+
+    with transaction.atomic():
+        AmmunitionBalance.objects.bulk_create(
+            [AmmunitionBalance(hunter_id=hunter_id, caliber=c) for c in calibers],
+            ignore_conflicts=True,
+        )
+        balances.update(**delta)
+        return totals.get()
+
+
+def record_purchase(hunter_id, ammo_type, quantity):
+    if quantity:
+        apply_delta(hunter_id, ammo_type, purchased=quantity)
+
+
+def record_shots(shots):
+    """
+    Count fired rounds for shots with ``gun`` loaded, one update per hunter
+    and caliber, and remember each shot's balance
+    """
+    groups = {}
+    for shot in shots:
+        groups.setdefault((shot.gun.owner_id, normalize_caliber(shot.gun.caliber)), []).append(shot)
+
+    snapshots = []
+    for (hunter_id, caliber), group in groups.items():
+        purchased, fired = apply_delta(hunter_id, caliber, fired=len(group))
+        fired -= len(group)
+        for shot in group:
+            fired += 1
+            snapshots.append((shot.id, (purchased, fired)))
+
+    with _snapshot_lock:
+        _by_shot.update(snapshots)
+        while len(_by_shot) > MAX_REMEMBERED_SHOTS:
+            _by_shot.popitem(last=False)
+
+
+def unrecord_shot(shot):
+    gun = Gun.objects.filter(pk=shot.gun_id).values_list('owner_id', 'caliber').first()
+    if gun is not None:
+        apply_delta(gun[0], gun[1], fired=-1)
+
+
+def get_balance(hunter_id, caliber=ALL_CALIBERS):
+    """(purchased, fired) for a hunter, across all calibers by default"""
+    return AmmunitionBalance.objects.filter(
+        hunter_id=hunter_id, caliber=normalize_caliber(caliber)
+    ).values_list('purchased', 'fired').first() or (0, 0)
+
+
+def balance_for(shot):
+    """(purchased, fired) for the shot's hunter as of that shot, else their current balance"""
+    with _snapshot_lock:
+        snapshot = _by_shot.get(shot.id)
+    if snapshot is not None:
+        return snapshot
+    return get_balance(shot.gun.owner_id)
+
+
+def clear_snapshots():
+    with _snapshot_lock:
+        _by_shot.clear()
+
+
+def compute_balances(hunter_ids=None):
+    """Recount balances from purchases and shots: {(hunter_id, caliber): [purchased, fired]}"""
+    purchases = AmmunitionPurchase.objects.values('hunter_id', 'ammo_type').annotate(total=Sum('quantity'))
+    shots = Shot.objects.values('gun__owner_id', 'gun__caliber').annotate(total=Count('id'))
+    if hunter_ids is not None:
+        purchases = purchases.filter(hunter_id__in=hunter_ids)
+        shots = shots.filter(gun__owner_id__in=hunter_ids)
+
+    balances = {}
+    for row in purchases:
+        for caliber in {ALL_CALIBERS, normalize_caliber(row['ammo_type'])}:
+            balances.setdefault((row['hunter_id'], caliber), [0, 0])[0] += row['total']
+    for row in shots:
+        for caliber in {ALL_CALIBERS, normalize_caliber(row['gun__caliber'])}:
+            balances.setdefault((row['gun__owner_id'], caliber), [0, 0])[1] += row['total']
+    return balances
+
+
+def rebuild_balances(hunter_ids=None):
+    """Replace stored balances with a full recount; returns the number of rows written"""
+    balances = compute_balances(hunter_ids)
+    with transaction.atomic():
+        stale = AmmunitionBalance.objects.all()
+        if hunter_ids is not None:
+            stale = stale.filter(hunter_id__in=hunter_ids)
+        stale.delete()
+        AmmunitionBalance.objects.bulk_create([
+            AmmunitionBalance(hunter_id=hunter_id, caliber=caliber, purchased=purchased, fired=fired)
+            for (hunter_id, caliber), (purchased, fired) in balances.items()
+        ])
+    return len(balances)
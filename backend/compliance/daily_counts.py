@@ -0,0 +1,93 @@
+"""
+Per-hunter daily shot counters for the DAILY_LIMIT rule
+
+Ingest signals count each shot towards the hunter's total for the shot's
+local day: the calendar day in the time zone of the zone the shot was
+fired in (the server time zone outside any zone). Totals live in
+DailyShotCounter, shared by every process that ingests shots (web workers,
+udp_ingest, mqtt_bridge): each batch is added with an F() update and the
+row is read back in the same transaction, so the count a shot brings its
+hunter to includes the shots every other process recorded before it.
+
+That count is remembered in memory per shot id, so the background
+evaluator judges each shot by the count at ingest time rather than by
+however many shots arrived before it got to it. Shots not remembered
+(evicted, or recorded elsewhere) are judged by the stored total.
+"""
+import threading
+from collections import Counter, OrderedDict
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import DailyShotCounter
+from .zone_index import zone_index
+
+# Shot id -> hunter's count for the day including that shot
+MAX_REMEMBERED_SHOTS = 100000
+
+
+def local_day(timestamp, matches):
+    """The shot's calendar day in the time zone of the first zone containing it"""
+    tzinfo = matches[0].schedule.tzinfo if matches else None
+    return timezone.localtime(timestamp, tzinfo).date()
+
+
+class DailyCounters:
+    """
+    Thread-safe per-shot daily counts, with totals kept in DailyShotCounter
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_shot = OrderedDict()
+
+    def _stored_count(self, hunter_id, day):
+        return DailyShotCounter.objects.filter(hunter_id=hunter_id, day=day).values_list(
+            'count', flat=True
+        ).first() or 0
+
+    def _persist(self, hunter_id, day, count):
+        """Add ``count`` shots to the stored total and return the new total"""
+        counters = DailyShotCounter.objects.filter(hunter_id=hunter_id, day=day)
+        with transaction.atomic():
+            if not counters.update(count=F('count') + count):
+                DailyShotCounter.objects.bulk_create(
+                    [DailyShotCounter(hunter_id=hunter_id, day=day)], ignore_conflicts=True
+                )
+                counters.update(count=F('count') + count)
+            # The updated row stays locked until commit, so this is our own total
+            return counters.values_list('count', flat=True).get()
+
+    def record(self, shots):
+        """Count new shots, with ``gun`` loaded, towards their hunter's local day"""
+        keyed = []
+        for shot in shots:
+            matches = zone_index.matches(shot.latitude, shot.longitude)
+            keyed.append((shot, (shot.gun.owner_id, local_day(shot.timestamp, matches))))
+
+        # Count before this batch, per hunter and day
+        before = {}
+        for (hunter_id, day), count in Counter(key for _, key in keyed).items():
+            before[(hunter_id, day)] = self._persist(hunter_id, day, count) - count
+
+        with self._lock:
+            for shot, key in keyed:
+                before[key] += 1
+                self._by_shot[shot.id] = before[key]
+            while len(self._by_shot) > MAX_REMEMBERED_SHOTS:
+                self._by_shot.popitem(last=False)
+
+    def count_for(self, shot, day):
+        """The hunter's count for ``day`` as of ``shot``"""
+        with self._lock:
+            count = self._by_shot.get(shot.id)
+        if count is None:
+            count = self._stored_count(shot.gun.owner_id, day)
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._by_shot = OrderedDict()
+
+
+daily_counters = DailyCounters()
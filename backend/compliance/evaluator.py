@@ -0,0 +1,187 @@
+"""
+Background compliance evaluation
+
+Shot signals submit shot ids here once their transaction commits, and a
+worker thread evaluates them in batches, so ingest requests no longer wait
+on the compliance rules. The queue is bounded: when it is full the
+submitting thread evaluates its own shots (caller-runs), which slows
+producers down instead of dropping shots or growing memory. With
+``COMPLIANCE_QUEUE_EAGER`` set, shots are evaluated inline as before.
+"""
+import atexit
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+from hunters.models import Shot
+from .views import check_compliance_violations
+
+
+def report_violations(shot, violations):
+    if violations:
+        print(f"⚠️  Compliance violations detected for shot by {shot.gun.owner.name}:")
+        for violation in violations:
+            print(f"   - {violation.get_violation_type_display()}: {violation.description}")
+
+
+def evaluate_shots(shot_ids):
+    """Run the compliance checks for a batch of shots; returns the number checked"""
+    shots = Shot.objects.select_related('gun__owner').filter(id__in=shot_ids).order_by('id')
+    checked = 0
+    for shot in shots:
+        try:
+            report_violations(shot, check_compliance_violations(shot))
+        except Exception as e:
+            print(f"Error checking compliance for shot {shot.id}: {e}")
+        checked += 1
+    return checked
+
+
+class ComplianceQueue:
+    """
+    Bounded queue of shot ids drained in batches by a daemon worker thread
+    """
+
+    def __init__(self, max_depth=None, batch_size=None, eager=None):
+        self.max_depth = max_depth
+        self.batch_size = batch_size
+        self.eager = eager
+        self._queue = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.stats = {
+            'submitted': 0, 'processed': 0, 'dequeued': 0, 'batches': 0, 'caller_runs': 0,
+            'max_depth_seen': 0, 'max_lag_s': 0.0, 'total_lag_s': 0.0,
+        }
+
+    def is_eager(self):
+        if self.eager is not None:
+            return self.eager
+        return settings.COMPLIANCE_QUEUE_EAGER
+
+    def get_batch_size(self):
+        return self.batch_size or settings.COMPLIANCE_QUEUE_BATCH_SIZE
+
+    def _get_queue(self):
+        if self._queue is None:
+            with self._lock:
+                if self._queue is None:
+                    self._queue = queue.Queue(self.max_depth or settings.COMPLIANCE_QUEUE_MAX_DEPTH)
+        return self._queue
+
+    def submit(self, shot_ids):
+        """Queue shots for evaluation; evaluates inline when eager or the queue is full"""
+        shot_ids = list(shot_ids)
+        with self._lock:
+            self.stats['submitted'] += len(shot_ids)
+        if self.is_eager():
+            self._process(shot_ids)
+            return
+
+        self._ensure_started()
+        pending = self._get_queue()
+        now = time.monotonic()
+        overflow = []
+        for shot_id in shot_ids:
+            try:
+                pending.put_nowait((shot_id, now))
+            except queue.Full:
+                overflow.append(shot_id)
+        with self._lock:
+            self.stats['max_depth_seen'] = max(self.stats['max_depth_seen'], pending.qsize())
+            self.stats['caller_runs'] += len(overflow)
+
+        if overflow:
+            # Backpressure: the producer pays for the shots that did not fit
+            self._process(overflow)
+
+    def _process(self, shot_ids, queued_at=()):
+        lags = [time.monotonic() - t for t in queued_at]
+        checked = evaluate_shots(shot_ids)
+        with self._lock:
+            self.stats['processed'] += checked
+            self.stats['batches'] += 1
+            if lags:
+                self.stats['dequeued'] += len(lags)
+                self.stats['total_lag_s'] += sum(lags)
+                self.stats['max_lag_s'] = max(self.stats['max_lag_s'], max(lags))
+
+    def _take_batch(self, timeout):
+        """Block for the first shot, then drain up to a batch without waiting"""
+        pending = self._get_queue()
+        try:
+            items = [pending.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        batch_size = self.get_batch_size()
+        while len(items) < batch_size:
+            try:
+                items.append(pending.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def drain(self):
+        """Evaluate everything queued, in the calling thread"""
+        while True:
+            items = self._take_batch(timeout=0.001)
+            if not items:
+                return
+            self._process([shot_id for shot_id, _ in items], [t for _, t in items])
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='compliance-evaluator', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            items = self._take_batch(timeout=0.5)
+            if not items:
+                continue
+            try:
+                self._process([shot_id for shot_id, _ in items], [t for _, t in items])
+            except Exception as e:
+                print(f"Error evaluating compliance batch of {len(items)} shots: {e}")
+            finally:
+                connections.close_all()
+
+    def stop(self):
+        """Stop the worker and evaluate whatever is still queued"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.drain()
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self.stats)
+        pending = self._get_queue()
+        return dict(
+            stats,
+            depth=pending.qsize(),
+            capacity=pending.maxsize,
+            eager=self.is_eager(),
+            worker_alive=self._thread is not None and self._thread.is_alive(),
+            avg_lag_s=stats['total_lag_s'] / stats['dequeued'] if stats['dequeued'] else 0.0,
+        )
+
+
+compliance_queue = ComplianceQueue()
+
+
+@atexit.register
+def _drain_on_exit():
+    try:
+        compliance_queue.stop()
+    except Exception:
+        pass
@@ -0,0 +1,90 @@
+"""
+Per-hunter license state for the ingest path
+
+The license rule needs a hunter's license number, expiry date, suspension
+and daily limit for every shot. Those are cached here per hunter (hunters
+without a license too), so evaluating a shot normally needs no license
+query.
+
+Entries are dropped when the hunter's license is saved or deleted in this
+process (see ``compliance.signals``). Licenses changed by another process
+(another web worker, udp_ingest, mqtt_bridge) are picked up when the entry
+expires: every entry is read again after ``LICENSE_CACHE_TTL`` seconds, and
+a valid license's entry also as soon as its expiry_date has passed.
+"""
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from django.utils import timezone
+from .models import HunterLicense
+from .rules import LicenseFacts
+
+
+class LicenseState(namedtuple('LicenseState', ['facts', 'recheck_after', 'expires_at'])):
+    """
+    ``facts``: LicenseFacts, None when the hunter has no license.
+    ``recheck_after``: date ordinal after which the entry is read again,
+    None when the license is not currently valid.
+    ``expires_at``: time.monotonic() after which the entry is read again.
+    """
+    __slots__ = ()
+
+    def is_valid(self, on_date):
+        facts = self.facts
+        return facts is not None and not facts.is_suspended and facts.expiry_date >= on_date
+
+    def is_fresh(self, today, now):
+        return now < self.expires_at and (self.recheck_after is None or today.toordinal() <= self.recheck_after)
+
+
+def load_state(hunter_id, today):
+    row = HunterLicense.objects.filter(hunter_id=hunter_id).values_list(
+        'license_number', 'expiry_date', 'is_suspended', 'max_daily_shots'
+    ).first()
+    expires_at = time.monotonic() + settings.LICENSE_CACHE_TTL
+    if row is None:
+        return LicenseState(None, None, expires_at)
+    state = LicenseState(LicenseFacts(*row), None, expires_at)
+    if state.is_valid(today):
+        state = state._replace(recheck_after=state.facts.expiry_date.toordinal())
+    return state
+
+
+class LicenseCache:
+    """
+    Thread-safe map of hunter id -> LicenseState
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, hunter_id):
+        today = timezone.now().date()
+        with self._lock:
+            state = self._states.get(hunter_id)
+        if state is not None and state.is_fresh(today, time.monotonic()):
+            self.stats['hits'] += 1
+            return state
+
+        self.stats['misses'] += 1
+        state = load_state(hunter_id, today)
+        with self._lock:
+            self._states[hunter_id] = state
+        return state
+
+    def facts(self, hunter_id):
+        """LicenseFacts for the compliance rules, or None when the hunter has no license"""
+        return self.get(hunter_id).facts
+
+    def invalidate(self, hunter_id=None):
+        with self._lock:
+            if hunter_id is None:
+                self._states = {}
+            else:
+                self._states.pop(hunter_id, None)
+
+
+license_cache = LicenseCache()
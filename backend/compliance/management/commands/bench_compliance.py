@@ -0,0 +1,371 @@
+"""
+Benchmark the compliance rule engine against synthetic datasets
+
+For each scale (zones, shots, hunters) a dataset is generated inside a
+transaction that is rolled back afterwards, then a sample of its shots is
+measured:
+
+* ``stages``: the lookups ``check_compliance_violations`` makes before the
+  rules run (zone match, ammunition balance, license state, daily count);
+* ``rules``: each pure rule in ``compliance.rules`` on precomputed inputs;
+* ``end_to_end``: ``check_compliance_violations`` per shot, with cold and
+  then warm caches, including recording violations;
+* ``batch``: ``evaluate_shots`` throughput over the whole sample.
+
+Latencies are in microseconds and queries are per shot. New rules should
+be added to RULES below so they are measured before they ship. With
+``--baseline`` the run fails when queries per shot grow or warm latency
+regresses beyond ``--tolerance`` against a previous ``--output`` file.
+"""
+import contextlib
+import io
+import json
+import random
+import time
+from datetime import time as dtime, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from hunters.models import Hunter, Gun, Shot
+from compliance import rules
+from compliance.balances import balance_for, clear_snapshots, rebuild_balances
+from compliance.daily_counts import daily_counters, local_day
+from compliance.evaluator import evaluate_shots
+from compliance.license_cache import license_cache
+from compliance.models import HuntingZone, HunterLicense, AmmunitionPurchase
+from compliance.open_violations import open_violations
+from compliance.views import check_compliance_violations
+from compliance.zone_index import zone_index
+
+DEFAULT_SCALES = ['10:1000', '100:10000', '1000:100000']
+
+# Synthetic data is spread over this box (lat, lng)
+REGION = (44.0, 48.0, 2.0, 8.0)
+TIMEZONES = ['', 'Europe/Paris', 'UTC']
+INSERT_BATCH = 5000
+
+# Rule name -> function of the per-shot inputs built in Command.prepare_inputs
+RULES = {
+    'ammo': lambda i: rules.check_ammo(i['shots_fired'], i['ammo_purchased']),
+    'zone': lambda i: rules.check_zone(i['latitude'], i['longitude'], i['timestamp'], i['zones']),
+    'zone_schedule': lambda i: rules.check_zone_schedule(i['timestamp'], i['zones']),
+    'license': lambda i: rules.check_license(i['license'], i['timestamp'].date()),
+    'daily_limit': lambda i: rules.check_daily_limit(i['shots_today'], i['day'], i['license']),
+}
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+def summarize(durations, queries, count):
+    """Latency percentiles in microseconds and queries per shot"""
+    durations = sorted(durations)
+    return {
+        'p50_us': round(percentile(durations, 0.50) * 1e6, 2),
+        'p95_us': round(percentile(durations, 0.95) * 1e6, 2),
+        'p99_us': round(percentile(durations, 0.99) * 1e6, 2),
+        'mean_us': round(sum(durations) / len(durations) * 1e6, 2),
+        'queries_per_shot': round(queries / count, 3),
+    }
+
+
+def parse_scale(value):
+    parts = value.split(':')
+    try:
+        zones, shots = int(parts[0]), int(parts[1])
+        hunters = int(parts[2]) if len(parts) > 2 else max(10, shots // 100)
+    except (IndexError, ValueError):
+        raise CommandError(f'Invalid scale {value!r}, expected ZONES:SHOTS[:HUNTERS]')
+    if min(zones, shots, hunters) < 1:
+        raise CommandError(f'Invalid scale {value!r}, counts must be positive')
+    return zones, shots, hunters
+
+
+def clear_caches():
+    """Drop the caches loaded from the database (daily counts are kept at ingest)"""
+    zone_index.invalidate()
+    license_cache.invalidate()
+    open_violations.clear()
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries run on a connection"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark compliance rule evaluation on synthetic data (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='append', dest='scales',
+                            help=f'ZONES:SHOTS[:HUNTERS], repeatable (default {" ".join(DEFAULT_SCALES)})')
+        parser.add_argument('--samples', type=int, default=500,
+                            help='Shots measured per scale')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the datasets')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+        parser.add_argument('--baseline', help='Results file from an earlier run to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative warm p50 latency regression against the baseline')
+
+    def handle(self, *args, **options):
+        if options['samples'] < 1:
+            raise CommandError('--samples must be positive')
+        scales = [parse_scale(value) for value in options['scales'] or DEFAULT_SCALES]
+
+        results = {'samples': options['samples'], 'seed': options['seed'], 'scales': []}
+        for zones, shots, hunters in scales:
+            if not options['json']:
+                self.stdout.write(f'Scale: {zones} zones, {shots} shots, {hunters} hunters')
+            results['scales'].append(self.run_scale(zones, shots, hunters, options))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.print_results(results)
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def run_scale(self, zones, shots, hunters, options):
+        rng = random.Random(options['seed'])
+        result = {'zones': zones, 'shots': shots, 'hunters': hunters}
+        try:
+            with transaction.atomic():
+                started = time.monotonic()
+                sample = self.build_dataset(rng, zones, shots, hunters, options['samples'])
+                result['build_s'] = round(time.monotonic() - started, 2)
+                result.update(self.measure(sample))
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            # The caches hold rows that were just rolled back
+            clear_caches()
+            daily_counters.clear()
+            clear_snapshots()
+        return result
+
+    def build_dataset(self, rng, zones, shots, hunters, samples):
+        """Insert the synthetic rows; returns the ids of the shots to measure"""
+        lat_min, lat_max, lng_min, lng_max = REGION
+        today = timezone.now().date()
+        now = timezone.now()
+        suffix = f'{rng.random():.12f}'[2:]
+
+        zone_rows = []
+        for i in range(zones):
+            lat, lng = rng.uniform(lat_min, lat_max), rng.uniform(lng_min, lng_max)
+            radius = rng.uniform(0.5, 15.0)
+            boundary = None
+            if rng.random() < 0.2:
+                d = radius / 111.0
+                boundary = [[lat - d, lng - d], [lat - d, lng + d], [lat + d, lng + d], [lat + d, lng - d]]
+            zone_rows.append(HuntingZone(
+                name=f'Bench zone {i}',
+                center_latitude=Decimal(f'{lat:.6f}'),
+                center_longitude=Decimal(f'{lng:.6f}'),
+                radius_km=Decimal(f'{radius:.2f}'),
+                boundary=boundary,
+                season_start=today - timedelta(days=rng.randint(0, 120)),
+                season_end=today + timedelta(days=rng.randint(-10, 120)),
+                daily_start_time=dtime(rng.randint(0, 8), 0),
+                daily_end_time=dtime(rng.randint(16, 23), 59),
+                allowed_weekdays=','.join(str(d) for d in range(7) if rng.random() < 0.8) or '5',
+                timezone=rng.choice(TIMEZONES),
+                is_active=rng.random() < 0.9,
+            ))
+        HuntingZone.objects.bulk_create(zone_rows, batch_size=INSERT_BATCH)
+
+        hunter_rows = Hunter.objects.bulk_create([
+            Hunter(name=f'Bench hunter {i}', license_number=f'BENCH-{suffix}-{i}') for i in range(hunters)
+        ], batch_size=INSERT_BATCH)
+        guns = Gun.objects.bulk_create([
+            Gun(device_id=f'BENCH-{suffix}-{i}', serial_number=f'BENCH-{suffix}-{i}', make='Bench',
+                model='Bench', caliber=rng.choice(['.308', '12ga', '.223']), weapon_type='rifle', owner=hunter)
+            for i, hunter in enumerate(hunter_rows)
+        ], batch_size=INSERT_BATCH)
+
+        licenses = []
+        for hunter in hunter_rows:
+            if rng.random() < 0.05:
+                continue  # Unlicensed
+            expiry = today + timedelta(days=rng.randint(-30, 365))
+            suspended = rng.random() < 0.02
+            licenses.append(HunterLicense(
+                hunter=hunter, license_number=f'BENCH-{suffix}-{hunter.id}', issue_date=today - timedelta(days=365),
+                expiry_date=expiry, license_type='Bench', issuing_authority='Bench',
+                max_daily_shots=rng.randint(20, 200), is_suspended=suspended,
+                valid=not suspended and expiry >= today,
+            ))
+        HunterLicense.objects.bulk_create(licenses, batch_size=INSERT_BATCH)
+
+        per_hunter = max(1, shots // hunters)
+        AmmunitionPurchase.objects.bulk_create([
+            AmmunitionPurchase(
+                hunter=gun.owner, ammo_type=gun.caliber, quantity=int(per_hunter * rng.uniform(0.5, 1.5)) + 1,
+                purchase_date=now - timedelta(days=rng.randint(1, 60)), purchase_price=Decimal('10.00'),
+                vendor='Bench',
+            )
+            for gun in guns for _ in range(rng.randint(1, 3))
+        ], batch_size=INSERT_BATCH)
+
+        shot_ids = []
+        for start in range(0, shots, INSERT_BATCH):
+            batch = Shot.objects.bulk_create([
+                Shot(gun=rng.choice(guns), sound_level=140.0, vibration_level=10.0,
+                     latitude=rng.uniform(lat_min, lat_max), longitude=rng.uniform(lng_min, lng_max))
+                for _ in range(min(INSERT_BATCH, shots - start))
+            ])
+            # What the shots_ingested receivers maintain, without queueing evaluations
+            daily_counters.record(batch)
+            shot_ids.extend(shot.id for shot in batch)
+        rebuild_balances([hunter.id for hunter in hunter_rows])
+        return shot_ids[-samples:]
+
+    def load_sample(self, shot_ids):
+        return list(Shot.objects.select_related('gun__owner').filter(id__in=shot_ids).order_by('id'))
+
+    def prepare_inputs(self, shot):
+        """The rule inputs ``check_compliance_violations`` builds for a shot"""
+        hunter_id = shot.gun.owner_id
+        purchased, fired = balance_for(shot)
+        matches = zone_index.matches(shot.latitude, shot.longitude)
+        day = local_day(shot.timestamp, matches)
+        return {
+            'latitude': shot.latitude,
+            'longitude': shot.longitude,
+            'timestamp': shot.timestamp,
+            'zones': [(m.zone.id, m.schedule) for m in matches],
+            'shots_fired': fired,
+            'ammo_purchased': purchased,
+            'license': license_cache.facts(hunter_id),
+            'shots_today': daily_counters.count_for(shot, day),
+            'day': day,
+        }
+
+    def timed(self, shots, fn):
+        """Per-shot durations and the total queries of ``fn(shot)`` over ``shots``"""
+        durations = []
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            for shot in shots:
+                started = time.perf_counter()
+                fn(shot)
+                durations.append(time.perf_counter() - started)
+        return summarize(durations, queries.count, len(shots))
+
+    def measure(self, shot_ids):
+        shots = self.load_sample(shot_ids)
+        clear_caches()
+        before = dict(zone_index.stats)
+
+        # Lookups, cold: the first pass loads the caches
+        stages = {
+            'zone_match': lambda s: zone_index.matches(s.latitude, s.longitude),
+            'balance': lambda s: balance_for(s),
+            'license': lambda s: license_cache.facts(s.gun.owner_id),
+            'daily_count': lambda s: daily_counters.count_for(
+                s, local_day(s.timestamp, zone_index.matches(s.latitude, s.longitude))
+            ),
+        }
+        result = {'stages': {name: self.timed(shots, fn) for name, fn in stages.items()}}
+        lookups = zone_index.stats['queries'] - before['queries']
+        result['zone_candidates_per_lookup'] = round(
+            (zone_index.stats['candidates'] - before['candidates']) / max(lookups, 1), 2
+        )
+
+        inputs = {shot.id: self.prepare_inputs(shot) for shot in shots}
+        result['rules'] = {
+            name: self.timed(shots, lambda s, rule=rule: rule(inputs[s.id]))
+            for name, rule in RULES.items()
+        }
+        result['findings'] = {
+            name: sum(1 for shot in shots if rule(inputs[shot.id]) is not None)
+            for name, rule in RULES.items()
+        }
+
+        clear_caches()
+        result['end_to_end'] = {
+            'cold': self.timed(shots, check_compliance_violations),
+            'warm': self.timed(shots, check_compliance_violations),
+        }
+
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), connection.execute_wrapper(queries):
+            evaluate_shots(shot_ids)
+        elapsed = time.perf_counter() - started
+        result['batch'] = {
+            'shots': len(shot_ids),
+            'seconds': round(elapsed, 4),
+            'shots_per_s': round(len(shot_ids) / elapsed, 1),
+            'queries_per_shot': round(queries.count / len(shot_ids), 3),
+        }
+        return result
+
+    def print_results(self, results):
+        for scale in results['scales']:
+            self.stdout.write(self.style.SUCCESS(
+                f"\n{scale['zones']} zones, {scale['shots']} shots, {scale['hunters']} hunters "
+                f"(built in {scale['build_s']}s)"
+            ))
+            self.stdout.write(f"{'':<24} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'queries/shot':>13}")
+            rows = [(f'stage {name}', stats) for name, stats in scale['stages'].items()]
+            rows += [(f'rule {name}', stats) for name, stats in scale['rules'].items()]
+            rows += [(f'end to end ({name})', stats) for name, stats in scale['end_to_end'].items()]
+            for label, stats in rows:
+                self.stdout.write(
+                    f"{label:<24} {stats['p50_us']:>10} {stats['p95_us']:>10} "
+                    f"{stats['p99_us']:>10} {stats['queries_per_shot']:>13}"
+                )
+            batch = scale['batch']
+            self.stdout.write(
+                f"batch: {batch['shots_per_s']} shots/s, {batch['queries_per_shot']} queries/shot; "
+                f"findings: {scale['findings']}"
+            )
+
+    def compare(self, results, path, tolerance):
+        try:
+            with open(path) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read baseline {path}: {e}')
+
+        previous = {(s['zones'], s['shots'], s['hunters']): s for s in baseline['scales']}
+        regressions = []
+        for scale in results['scales']:
+            before = previous.get((scale['zones'], scale['shots'], scale['hunters']))
+            if before is None:
+                continue
+            label = f"{scale['zones']}:{scale['shots']}:{scale['hunters']}"
+            for group in ('stages', 'rules', 'end_to_end'):
+                for name, stats in scale[group].items():
+                    old = before.get(group, {}).get(name)
+                    if old is None:
+                        continue
+                    if stats['queries_per_shot'] > old['queries_per_shot']:
+                        regressions.append(
+                            f"{label} {group}.{name}: queries/shot {old['queries_per_shot']} -> {stats['queries_per_shot']}"
+                        )
+            # Microsecond stage and rule timings are too noisy to compare; judge latency end to end
+            new, old = scale['end_to_end']['warm'], before['end_to_end']['warm']
+            if new['p50_us'] > old['p50_us'] * (1 + tolerance):
+                regressions.append(f"{label} end_to_end.warm: p50 {old['p50_us']}us -> {new['p50_us']}us")
+        if regressions:
+            raise CommandError('Regressions against baseline:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {path}'))
@@ -0,0 +1,285 @@
+"""
+Re-evaluate historical shots against the current compliance rules
+
+Shots are streamed in id order in keyset chunks, evaluated in a process
+pool, and reconciled with existing ComplianceViolation rows: missing
+violations are created, violations the rules no longer produce are
+resolved, and violations a previous re-audit resolved are reopened if they
+apply again. Violations resolved by a person are left alone. As with live
+evaluation, a shot whose condition already has an open violation (same
+hunter, type and zone) is covered by it rather than given its own row.
+Running it twice changes nothing the second time.
+"""
+import bisect
+import json
+import os
+import time
+from collections import Counter, deque
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+from hunters.models import Shot
+from compliance import reaudit, rules
+from compliance.daily_counts import local_day
+from compliance.open_violations import evidence_entry
+from compliance.zone_index import ZoneIndex
+from compliance.models import HuntingZone, AmmunitionPurchase, ComplianceViolation, HunterLicense
+
+REAUDIT_NOTE = 'Cleared by compliance re-audit'
+
+
+class Command(BaseCommand):
+    help = 'Re-check historical shots against the compliance rules and reconcile violations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Shots per keyset chunk')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (1 evaluates in this process)')
+        parser.add_argument('--checkpoint', default='reaudit_checkpoint.json',
+                            help='File recording the last reconciled shot id')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue after the shot id in the checkpoint file')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without writing')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        start_id = 0
+        totals = {'shots': 0, 'created': 0, 'resolved': 0, 'reopened': 0}
+        if options['resume']:
+            start_id, totals = self.read_checkpoint(options['checkpoint'])
+            self.stdout.write(f'Resuming after shot {start_id}')
+
+        zones = [
+            SimpleNamespace(**zone) for zone in HuntingZone.objects.values(
+                'id', 'is_active', 'center_latitude', 'center_longitude', 'radius_km', 'boundary',
+                'season_start', 'season_end', 'daily_start_time', 'daily_end_time', 'allowed_weekdays',
+                'timezone',
+            )
+        ]
+        licenses = {
+            hunter_id: rules.LicenseFacts(*facts)
+            for hunter_id, *facts in HunterLicense.objects.values_list(
+                'hunter_id', 'license_number', 'expiry_date', 'is_suspended', 'max_daily_shots'
+            )
+        }
+        # Local days are counted here, in shot order, so this process needs the zones too
+        self.zone_index = ZoneIndex(settings.ZONE_INDEX_CELL_DEGREES)
+        self.zone_index.load(zones)
+        self.load_purchases()
+        # Shots already audited still count towards each hunter's rounds fired
+        self.fired = dict(
+            Shot.objects.filter(id__lte=start_id).values('gun__owner_id')
+            .annotate(total=Count('id')).values_list('gun__owner_id', 'total')
+        )
+        self.seed_daily_counts(start_id)
+        self.load_open_violations()
+        remaining = Shot.objects.filter(id__gt=start_id).count()
+        self.stdout.write(f'Re-auditing {remaining} shots in chunks of {chunk_size}')
+
+        initargs = (zones, licenses, settings.ZONE_INDEX_CELL_DEGREES)
+        started = time.monotonic()
+        done = 0
+        for last_id, results in self.evaluate(start_id, chunk_size, options['workers'], initargs):
+            counts = self.reconcile(results, options['dry_run'])
+            done += len(results)
+            for key, value in counts.items():
+                totals[key] += value
+            totals['shots'] += len(results)
+            if not options['dry_run']:
+                self.write_checkpoint(options['checkpoint'], last_id, totals)
+
+            rate = done / max(time.monotonic() - started, 1e-9)
+            eta = (remaining - done) / rate if rate else 0
+            self.stdout.write(
+                f"{done}/{remaining} shots ({rate:.0f}/s, ETA {eta:.0f}s) "
+                f"created {counts['created']}, resolved {counts['resolved']}, reopened {counts['reopened']}"
+            )
+
+        verb = 'Would change' if options['dry_run'] else 'Done.'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals['shots']} shots: created {totals['created']}, "
+            f"resolved {totals['resolved']}, reopened {totals['reopened']}"
+        ))
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read checkpoint {path}: {e}')
+        return checkpoint['last_id'], checkpoint['totals']
+
+    def write_checkpoint(self, path, last_id, totals):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'last_id': last_id, 'totals': totals}, f)
+        os.replace(tmp_path, path)
+
+    def load_purchases(self):
+        """Per hunter: purchase dates and cumulative rounds, to look up what was bought by a shot's time"""
+        self.purchase_dates = {}
+        self.purchase_totals = {}
+        purchases = AmmunitionPurchase.objects.order_by('hunter_id', 'purchase_date').values_list(
+            'hunter_id', 'purchase_date', 'quantity'
+        )
+        for hunter_id, purchase_date, quantity in purchases:
+            totals = self.purchase_totals.setdefault(hunter_id, [])
+            self.purchase_dates.setdefault(hunter_id, []).append(purchase_date)
+            totals.append((totals[-1] if totals else 0) + quantity)
+
+    def purchased_by(self, hunter_id, when):
+        index = bisect.bisect_right(self.purchase_dates.get(hunter_id, []), when)
+        return self.purchase_totals[hunter_id][index - 1] if index else 0
+
+    def shot_day(self, hunter_id, latitude, longitude, timestamp):
+        return (hunter_id, local_day(timestamp, self.zone_index.matches(latitude, longitude)))
+
+    def seed_daily_counts(self, start_id):
+        """Count already audited shots on the local days the remaining shots start on"""
+        self.today = Counter()
+        first = Shot.objects.filter(id__gt=start_id).order_by('id').values_list('timestamp', flat=True).first()
+        if not start_id or first is None:
+            return
+        # Local days differ from UTC by at most 14 hours either way
+        earlier = Shot.objects.filter(id__lte=start_id, timestamp__gte=first - timedelta(days=1)).values_list(
+            'gun__owner_id', 'latitude', 'longitude', 'timestamp'
+        )
+        self.today.update(self.shot_day(*row) for row in earlier.iterator())
+
+    def read_chunks(self, start_id, chunk_size):
+        """Keyset pagination by id, with each shot's ammunition and daily counts at the time"""
+        last_id = start_id
+        while True:
+            rows = list(
+                Shot.objects.filter(id__gt=last_id).order_by('id').values_list(
+                    'id', 'gun_id', 'gun__owner_id', 'latitude', 'longitude', 'timestamp'
+                )[:chunk_size]
+            )
+            if not rows:
+                return
+            chunk = []
+            for row in rows:
+                _, _, hunter_id, latitude, longitude, timestamp = row
+                self.fired[hunter_id] = self.fired.get(hunter_id, 0) + 1
+                day = self.shot_day(hunter_id, latitude, longitude, timestamp)
+                self.today[day] += 1
+                chunk.append((
+                    row, self.fired[hunter_id], self.purchased_by(hunter_id, timestamp), day[1], self.today[day]
+                ))
+            last_id = rows[-1][0]
+            yield last_id, chunk
+
+    def evaluate(self, start_id, chunk_size, workers, initargs):
+        """Yield (last shot id, results) per chunk, in order"""
+        if workers <= 1:
+            reaudit.init_worker(*initargs)
+            for last_id, chunk in self.read_chunks(start_id, chunk_size):
+                yield last_id, reaudit.evaluate_chunk(chunk)
+            return
+
+        # Children must not inherit open database connections
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=reaudit.init_worker, initargs=initargs) as pool:
+            pending = deque()
+            for last_id, chunk in self.read_chunks(start_id, chunk_size):
+                pending.append((last_id, pool.submit(reaudit.evaluate_chunk, chunk)))
+                if len(pending) >= workers * 2:
+                    last, future = pending.popleft()
+                    yield last, future.result()
+            while pending:
+                last, future = pending.popleft()
+                yield last, future.result()
+
+    def load_open_violations(self):
+        """Coalescing key -> id of the open violation for it"""
+        self.open_keys = {
+            rules.coalesce_key(hunter_id, violation_type, zone_id, evidence or {}): pk
+            for pk, hunter_id, violation_type, zone_id, evidence in ComplianceViolation.objects.filter(
+                resolved=False, violation_type__in=rules.RULE_TYPES
+            ).order_by('id').values_list('id', 'hunter_id', 'violation_type', 'hunting_zone_id', 'evidence_data')
+        }
+
+    def reconcile(self, results, dry_run):
+        """Bring the violations of one chunk of shots in line with the rule findings"""
+        existing = {}
+        for violation in ComplianceViolation.objects.filter(
+            shot_id__in=[shot_id for shot_id, _, _, _ in results],
+            violation_type__in=rules.RULE_TYPES,
+        ):
+            existing.setdefault((violation.shot_id, violation.violation_type), []).append(violation)
+
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        counts = {'created': 0, 'resolved': 0, 'reopened': 0}
+        for shot_id, gun_id, hunter_id, findings in results:
+            found = {finding.violation_type: finding for finding in findings}
+            for violation_type, finding in found.items():
+                key = rules.coalesce_key(hunter_id, violation_type, finding.zone_id, finding.evidence)
+                current = existing.get((shot_id, violation_type))
+                if key in self.open_keys and not any(v.pk == self.open_keys[key] for v in current or []):
+                    # An open violation for the same condition already covers this shot
+                    continue
+                if not current:
+                    to_create.append(ComplianceViolation(
+                        hunter_id=hunter_id,
+                        violation_type=violation_type,
+                        severity=finding.severity,
+                        shot_id=shot_id,
+                        gun_id=gun_id,
+                        hunting_zone_id=finding.zone_id,
+                        description=finding.description,
+                        evidence_data=finding.evidence,
+                        detected_at=now,
+                        last_seen_at=now,
+                        recent_evidence=[evidence_entry(shot_id, now, finding.evidence)],
+                    ))
+                    self.open_keys[key] = None
+                elif all(self.cleared_by_reaudit(violation) for violation in current):
+                    for violation in current:
+                        violation.resolved = False
+                        violation.resolved_at = None
+                        violation.notes = ''
+                        to_update.append(violation)
+                        counts['reopened'] += 1
+                    self.open_keys[key] = current[-1].pk
+
+            for violation_type in set(rules.RULE_TYPES) - found.keys():
+                for violation in existing.get((shot_id, violation_type), []):
+                    if not violation.resolved:
+                        violation.resolved = True
+                        violation.resolved_at = now
+                        violation.notes = REAUDIT_NOTE
+                        to_update.append(violation)
+                        counts['resolved'] += 1
+                        key = rules.coalesce_key(
+                            hunter_id, violation_type, violation.hunting_zone_id, violation.evidence_data or {}
+                        )
+                        if self.open_keys.get(key) == violation.pk:
+                            del self.open_keys[key]
+
+        counts['created'] = len(to_create)
+        if not dry_run:
+            with transaction.atomic():
+                created = ComplianceViolation.objects.bulk_create(to_create)
+                ComplianceViolation.objects.bulk_update(to_update, ['resolved', 'resolved_at', 'notes'])
+            for violation in created:
+                key = rules.coalesce_key(
+                    violation.hunter_id, violation.violation_type, violation.hunting_zone_id, violation.evidence_data
+                )
+                if self.open_keys.get(key) is None:
+                    self.open_keys[key] = violation.pk
+        return counts
+
+    def cleared_by_reaudit(self, violation):
+        return violation.resolved and violation.resolved_by_id is None and violation.notes == REAUDIT_NOTE
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from compliance.balances import compute_balances, rebuild_balances
+from compliance.models import AmmunitionBalance
+
+class Command(BaseCommand):
+    help = 'Recount per-hunter ammunition balances from purchases and shots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hunter', type=int, action='append', dest='hunters',
+                            help='Only rebuild this hunter id (repeatable)')
+        parser.add_argument('--check', action='store_true',
+                            help='Report drifted balances without writing')
+
+    def handle(self, *args, **options):
+        hunter_ids = options['hunters']
+
+        if options['check']:
+            expected = compute_balances(hunter_ids)
+            stored = AmmunitionBalance.objects.all()
+            if hunter_ids:
+                stored = stored.filter(hunter_id__in=hunter_ids)
+            actual = {
+                (hunter_id, caliber): [purchased, fired]
+                for hunter_id, caliber, purchased, fired
+                in stored.values_list('hunter_id', 'caliber', 'purchased', 'fired')
+            }
+            drifted = sorted(
+                key for key in expected.keys() | actual.keys()
+                if expected.get(key, [0, 0]) != actual.get(key, [0, 0])
+            )
+            for hunter_id, caliber in drifted:
+                self.stdout.write(
+                    f"Hunter {hunter_id} {caliber or 'all calibers'}: "
+                    f"stored {actual.get((hunter_id, caliber))}, expected {expected.get((hunter_id, caliber))}"
+                )
+            self.stdout.write(f'{len(drifted)} drifted balances')
+            return
+
+        count = rebuild_balances(hunter_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} ammunition balances'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from compliance.models import HunterLicense
+
+class Command(BaseCommand):
+    help = 'Refresh the materialized HunterLicense.valid flag (run daily, after midnight UTC)'
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        expired = HunterLicense.objects.filter(valid=True).filter(
+            Q(expiry_date__lt=today) | Q(is_suspended=True)
+        ).update(valid=False)
+        # Licenses changed with queryset updates, which bypass save()
+        restored = HunterLicense.objects.filter(
+            valid=False, is_suspended=False, expiry_date__gte=today
+        ).update(valid=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Marked {expired} licenses invalid and {restored} valid'
+        ))
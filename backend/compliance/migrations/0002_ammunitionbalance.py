@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_balances(apps, schema_editor):
+    AmmunitionBalance = apps.get_model('compliance', 'AmmunitionBalance')
+    AmmunitionPurchase = apps.get_model('compliance', 'AmmunitionPurchase')
+    Shot = apps.get_model('hunters', 'Shot')
+
+    balances = {}
+    purchases = AmmunitionPurchase.objects.values('hunter_id', 'ammo_type').annotate(total=models.Sum('quantity'))
+    for row in purchases:
+        for caliber in {'', (row['ammo_type'] or '').strip().lower()}:
+            balances.setdefault((row['hunter_id'], caliber), [0, 0])[0] += row['total']
+    shots = Shot.objects.values('gun__owner_id', 'gun__caliber').annotate(total=models.Count('id'))
+    for row in shots:
+        for caliber in {'', (row['gun__caliber'] or '').strip().lower()}:
+            balances.setdefault((row['gun__owner_id'], caliber), [0, 0])[1] += row['total']
+
+    AmmunitionBalance.objects.bulk_create([
+        AmmunitionBalance(hunter_id=hunter_id, caliber=caliber, purchased=purchased, fired=fired)
+        for (hunter_id, caliber), (purchased, fired) in balances.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hunters', '0003_shot_event_id'),
+        ('compliance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AmmunitionBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('caliber', models.CharField(blank=True, max_length=50)),
+                ('purchased', models.IntegerField(default=0)),
+                ('fired', models.IntegerField(default=0)),
+                ('hunter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ammo_balances', to='hunters.hunter')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ammunitionbalance',
+            constraint=models.UniqueConstraint(fields=('hunter', 'caliber'), name='unique_ammo_balance_per_caliber'),
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0002_ammunitionbalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='huntingzone',
+            name='boundary',
+            field=models.JSONField(blank=True, help_text='Optional polygon as [[lat, lng], ...]; replaces the center/radius circle when set', null=True),
+        ),
+    ]
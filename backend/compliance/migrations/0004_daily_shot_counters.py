@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:16
+
+import compliance.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hunters', '0003_shot_event_id'),
+        ('compliance', '0003_huntingzone_boundary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='huntingzone',
+            name='timezone',
+            field=models.CharField(blank=True, help_text="IANA time zone of the zone's hours and daily limits, e.g. America/Toronto (blank: server time zone)", max_length=64, validators=[compliance.models.validate_timezone_name]),
+        ),
+        migrations.AlterField(
+            model_name='complianceviolation',
+            name='violation_type',
+            field=models.CharField(choices=[('AMMO_EXCESS', 'Shot more ammunition than purchased'), ('ILLEGAL_ZONE', 'Shot in restricted/illegal area'), ('ILLEGAL_TIME', 'Shot outside permitted hours'), ('ILLEGAL_DATE', 'Shot outside hunting season'), ('UNLICENSED', 'Hunter license expired or invalid'), ('WEAPON_UNREGISTERED', 'Used unregistered weapon'), ('DAILY_LIMIT', 'Exceeded daily shot limit')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DailyShotCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('hunter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_shot_counters', to='hunters.hunter')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailyshotcounter',
+            constraint=models.UniqueConstraint(fields=('hunter', 'day'), name='unique_daily_shot_counter'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:17
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def last_seen_from_detected(apps, schema_editor):
+    ComplianceViolation = apps.get_model('compliance', 'ComplianceViolation')
+    ComplianceViolation.objects.update(last_seen_at=models.F('detected_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0004_daily_shot_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complianceviolation',
+            name='hit_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='complianceviolation',
+            name='last_seen_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='complianceviolation',
+            name='recent_evidence',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(last_seen_from_detected, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:20
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def materialize_validity(apps, schema_editor):
+    HunterLicense = apps.get_model('compliance', 'HunterLicense')
+    HunterLicense.objects.filter(
+        models.Q(is_suspended=True) | models.Q(expiry_date__lt=timezone.now().date())
+    ).update(valid=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0005_violation_coalescing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hunterlicense',
+            name='valid',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='hunterlicense',
+            name='expiry_date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='hunterlicense',
+            index=models.Index(fields=['valid', 'expiry_date'], name='license_valid_expiry_idx'),
+        ),
+        migrations.RunPython(materialize_validity, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,15 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from decimal import Decimal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+def validate_timezone_name(value):
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f'Unknown time zone: {value}')
 
 class HuntingZone(models.Model):
     """Legal hunting areas with time restrictions"""
@@ -12,6 +20,11 @@ class HuntingZone(models.Model):
     center_latitude = models.DecimalField(max_digits=10, decimal_places=8)
     center_longitude = models.DecimalField(max_digits=11, decimal_places=8)
     radius_km = models.DecimalField(max_digits=5, decimal_places=2)  # Radius in kilometers
+    boundary = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Optional polygon as [[lat, lng], ...]; replaces the center/radius circle when set"
+    )
     
     # Time restrictions
     season_start = models.DateField()
@@ -25,6 +38,12 @@ class HuntingZone(models.Model):
         default="1,2,3,4,5,6,0",  # Default: all days
         help_text="Comma-separated weekday numbers (0=Monday, 6=Sunday)"
     )
+    timezone = models.CharField(
+        max_length=64,
+        blank=True,
+        validators=[validate_timezone_name],
+        help_text="IANA time zone of the zone's hours and daily limits, e.g. America/Toronto (blank: server time zone)"
+    )
     
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -56,6 +75,47 @@ class AmmunitionPurchase(models.Model):
     def __str__(self):
         return f"{self.hunter.name} - {self.ammo_type} ({self.quantity} units)"
 
+class AmmunitionBalance(models.Model):
+    """
+    Running totals of rounds purchased and fired, per hunter and caliber.
+    The row with an empty caliber holds the hunter's totals across all
+    calibers. Kept current by compliance.balances; rebuild with
+    ``python manage.py rebuild_ammo_balances``.
+    """
+    hunter = models.ForeignKey('hunters.Hunter', on_delete=models.CASCADE, related_name='ammo_balances')
+    caliber = models.CharField(max_length=50, blank=True)
+    purchased = models.IntegerField(default=0)
+    fired = models.IntegerField(default=0)
+
+    @property
+    def remaining(self):
+        return self.purchased - self.fired
+
+    def __str__(self):
+        return f"{self.hunter.name} - {self.caliber or 'all calibers'} ({self.fired}/{self.purchased})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hunter', 'caliber'], name='unique_ammo_balance_per_caliber'),
+        ]
+
+class DailyShotCounter(models.Model):
+    """
+    Shots fired per hunter per local day, kept by compliance.daily_counts.
+    The day is the calendar day in the time zone of the zone the shot was in.
+    """
+    hunter = models.ForeignKey('hunters.Hunter', on_delete=models.CASCADE, related_name='daily_shot_counters')
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.hunter.name} - {self.day}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hunter', 'day'], name='unique_daily_shot_counter'),
+        ]
+
 class ComplianceViolation(models.Model):
     """Track hunting violations and compliance issues"""
     VIOLATION_TYPES = [
@@ -65,6 +125,7 @@ class ComplianceViolation(models.Model):
         ('ILLEGAL_DATE', 'Shot outside hunting season'),
         ('UNLICENSED', 'Hunter license expired or invalid'),
         ('WEAPON_UNREGISTERED', 'Used unregistered weapon'),
+        ('DAILY_LIMIT', 'Exceeded daily shot limit'),
     ]
     
     SEVERITY_LEVELS = [
@@ -93,6 +154,11 @@ class ComplianceViolation(models.Model):
     # Evidence data
     evidence_data = models.JSONField(default=dict, blank=True)
     
+    # Repeat occurrences of the same open condition are coalesced into this row
+    hit_count = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(default=timezone.now)
+    recent_evidence = models.JSONField(default=list, blank=True)
+    
     def __str__(self):
         return f"{self.hunter.name} - {self.get_violation_type_display()} ({self.severity})"
 
@@ -101,7 +167,7 @@ class HunterLicense(models.Model):
     hunter = models.OneToOneField('hunters.Hunter', on_delete=models.CASCADE, related_name='license')
     license_number = models.CharField(max_length=50, unique=True)
     issue_date = models.DateField()
-    expiry_date = models.DateField()
+    expiry_date = models.DateField(db_index=True)
     license_type = models.CharField(max_length=50)
     issuing_authority = models.CharField(max_length=200)
     
@@ -116,10 +182,26 @@ class HunterLicense(models.Model):
     is_suspended = models.BooleanField(default=False)
     suspension_reason = models.TextField(blank=True)
     
+    # Materialized is_valid, set on save and by the daily sweep_license_validity
+    # command; may still be True for a license that expired since the last sweep
+    valid = models.BooleanField(default=True, editable=False)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['valid', 'expiry_date'], name='license_valid_expiry_idx'),
+        ]
+    
     @property
     def is_valid(self):
         return not self.is_suspended and self.expiry_date >= timezone.now().date()
     
+    def save(self, *args, **kwargs):
+        self.valid = self.is_valid
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'valid'}
+        super().save(*args, **kwargs)
+    
     @property
     def days_until_expiry(self):
         return (self.expiry_date - timezone.now().date()).days
@@ -0,0 +1,127 @@
+"""
+Coalescing of repeat violations into one open ComplianceViolation
+
+While a condition persists (a hunter over their ammunition balance,
+unlicensed, shooting out of hours in a zone...), every further shot hits
+the same open violation: its hit_count, last_seen_at, description and a
+short list of recent evidence are updated instead of inserting a new row.
+Open violations are found through an in-memory index keyed by
+``rules.coalesce_key``, loaded with one query on first use. Resolving or
+deleting a violation removes it from the index (see ``compliance.signals``),
+so the next occurrence opens a new one.
+"""
+import threading
+from django.db.models import F
+from django.utils import timezone
+from .models import ComplianceViolation
+from .rules import coalesce_key
+
+# Occurrences kept in ComplianceViolation.recent_evidence
+RECENT_EVIDENCE_LIMIT = 20
+
+
+def evidence_entry(shot_id, seen_at, evidence):
+    return {'shot_id': shot_id, 'seen_at': seen_at.isoformat(), 'evidence': evidence}
+
+
+class OpenViolationIndex:
+    """
+    Thread-safe map of coalescing key -> open violation id and recent evidence
+    """
+
+    def __init__(self):
+        # Re-entrant: creating a violation fires post_save, which calls add()
+        self._lock = threading.RLock()
+        self._open = None
+        self.stats = {'created': 0, 'coalesced': 0}
+
+    def _load(self):
+        rows = ComplianceViolation.objects.filter(resolved=False).order_by('id').values_list(
+            'id', 'hunter_id', 'violation_type', 'hunting_zone_id', 'evidence_data', 'recent_evidence'
+        )
+        # Later rows win when older duplicates are still open
+        return {
+            coalesce_key(hunter_id, violation_type, zone_id, evidence or {}): (pk, list(recent or []))
+            for pk, hunter_id, violation_type, zone_id, evidence, recent in rows
+        }
+
+    def _entries(self):
+        if self._open is None:
+            self._open = self._load()
+        return self._open
+
+    def record(self, hunter_id, finding, shot=None, gun=None, seen_at=None):
+        """
+        Record one occurrence of ``finding``: hit the open violation for its
+        key, or create one. Returns the new ComplianceViolation, or None when
+        the occurrence was coalesced into an open one.
+        """
+        seen_at = seen_at or timezone.now()
+        key = coalesce_key(hunter_id, finding.violation_type, finding.zone_id, finding.evidence)
+        entry = evidence_entry(shot.id if shot else None, seen_at, finding.evidence)
+
+        with self._lock:
+            current = self._entries().get(key)
+            if current is not None:
+                violation_id, recent = current
+                recent = (recent + [entry])[-RECENT_EVIDENCE_LIMIT:]
+                self._open[key] = (violation_id, recent)
+
+        if current is not None:
+            hit = ComplianceViolation.objects.filter(pk=violation_id, resolved=False).update(
+                hit_count=F('hit_count') + 1,
+                last_seen_at=seen_at,
+                description=finding.description,
+                recent_evidence=recent,
+            )
+            if hit:
+                self.stats['coalesced'] += 1
+                return None
+            # Resolved or deleted by another process
+            self.forget(violation_id)
+
+        with self._lock:
+            # Create under the lock so concurrent misses open a single row
+            if self._entries().get(key) is not None:
+                return self.record(hunter_id, finding, shot, gun, seen_at)
+            violation = ComplianceViolation.objects.create(
+                hunter_id=hunter_id,
+                violation_type=finding.violation_type,
+                severity=finding.severity,
+                shot=shot,
+                gun=gun,
+                hunting_zone_id=finding.zone_id,
+                description=finding.description,
+                evidence_data=finding.evidence,
+                detected_at=seen_at,
+                last_seen_at=seen_at,
+                recent_evidence=[entry],
+            )
+            self._open[key] = (violation.pk, [entry])
+            self.stats['created'] += 1
+        return violation
+
+    def add(self, violation):
+        """Index a violation created elsewhere, if it is open"""
+        if violation.resolved:
+            return self.forget(violation.pk)
+        key = coalesce_key(
+            violation.hunter_id, violation.violation_type, violation.hunting_zone_id, violation.evidence_data or {}
+        )
+        with self._lock:
+            if self._open is not None:
+                self._open[key] = (violation.pk, list(violation.recent_evidence or []))
+
+    def forget(self, violation_id):
+        with self._lock:
+            if self._open is None:
+                return
+            for key in [k for k, (pk, _) in self._open.items() if pk == violation_id]:
+                del self._open[key]
+
+    def clear(self):
+        with self._lock:
+            self._open = None
+
+
+open_violations = OpenViolationIndex()
@@ -0,0 +1,57 @@
+"""
+Worker side of the ``reaudit_shots`` command
+
+Worker processes receive the zones and licenses once, as plain picklable
+values, and then evaluate chunks of shot rows with the pure rules in
+``compliance.rules``. Nothing here queries the database, and model modules
+are only imported after Django is set up, so this also works with the
+spawn and forkserver start methods.
+"""
+from . import rules
+
+# Fields of each shot row sent to the workers
+SHOT_ROW_FIELDS = ('id', 'gun_id', 'hunter_id', 'latitude', 'longitude', 'timestamp')
+
+# Per-process state set by init_worker
+_zone_index = None
+_licenses = {}
+
+
+def init_worker(zones, licenses, cell_degrees):
+    """
+    ``zones``: objects with the HuntingZone shape and schedule fields;
+    ``licenses``: {hunter_id: rules.LicenseFacts}
+    """
+    global _zone_index, _licenses
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from .zone_index import ZoneIndex
+
+    _zone_index = ZoneIndex(cell_degrees)
+    _zone_index.load(zones)
+    _licenses = licenses
+
+
+def evaluate_chunk(rows):
+    """
+    ``rows``: (shot row, shots fired so far, rounds purchased by then, local
+    day, shots on that day so far) tuples.
+    Returns (shot_id, gun_id, hunter_id, findings) for every shot.
+    """
+    results = []
+    for (shot_id, gun_id, hunter_id, latitude, longitude, timestamp), fired, purchased, day, today in rows:
+        findings = rules.evaluate(
+            latitude,
+            longitude,
+            timestamp,
+            zones=[(m.zone.id, m.schedule) for m in _zone_index.matches(latitude, longitude)],
+            shots_fired=fired,
+            ammo_purchased=purchased,
+            license=_licenses.get(hunter_id),
+            shots_today=today,
+            day=day,
+        )
+        results.append((shot_id, gun_id, hunter_id, findings))
+    return results
@@ -0,0 +1,123 @@
+"""
+Compliance rules as pure functions
+
+Each rule takes plain values describing a shot and returns a Finding, or
+None when the shot complies. Rules never touch the database, so the same
+code serves the live evaluator (``check_compliance_violations``) and the
+``reaudit_shots`` command, which runs them in worker processes.
+"""
+from collections import namedtuple
+
+Finding = namedtuple('Finding', ['violation_type', 'severity', 'description', 'evidence', 'zone_id'])
+Finding.__new__.__defaults__ = (None,)
+
+# Facts the rules need about a hunter's license: None when there is none
+LicenseFacts = namedtuple('LicenseFacts', ['license_number', 'expiry_date', 'is_suspended', 'max_daily_shots'])
+
+# Violation types produced by these rules; the re-audit reconciles only these
+RULE_TYPES = ('AMMO_EXCESS', 'ILLEGAL_ZONE', 'ILLEGAL_DATE', 'ILLEGAL_TIME', 'UNLICENSED', 'DAILY_LIMIT')
+
+
+def check_ammo(shots_fired, ammo_purchased):
+    if shots_fired > ammo_purchased:
+        return Finding(
+            'AMMO_EXCESS', 'HIGH',
+            f"Hunter has fired {shots_fired} shots but only purchased {ammo_purchased} rounds",
+            {'shots_fired': shots_fired, 'ammo_purchased': ammo_purchased},
+        )
+
+
+def check_zone(latitude, longitude, timestamp, zones):
+    """``zones``: (zone id, ZoneSchedule) of the active zones containing the shot location"""
+    if not zones:
+        return Finding(
+            'ILLEGAL_ZONE', 'HIGH',
+            "Shot fired outside of permitted hunting zones",
+            {
+                'shot_location': {'lat': latitude, 'lng': longitude},
+                'timestamp': timestamp.isoformat(),
+            },
+        )
+
+
+def check_zone_schedule(timestamp, zones):
+    """
+    Within a zone, the shot must fall in the season of one of the zones
+    containing it (else ILLEGAL_DATE) and on an allowed weekday and time of
+    one of those (else ILLEGAL_TIME), each in that zone's time zone.
+    """
+    if not zones:
+        return None
+    in_season = [(zone_id, s) for zone_id, s in zones if s.in_season(s.local(timestamp).date())]
+    if not in_season:
+        return Finding(
+            'ILLEGAL_DATE', 'MEDIUM',
+            "Shot fired outside the hunting season",
+            {'timestamp': timestamp.isoformat(), 'zones': [zone_id for zone_id, _ in zones]},
+            zones[0][0],
+        )
+    if not any(s.is_open(timestamp) for _, s in in_season):
+        return Finding(
+            'ILLEGAL_TIME', 'MEDIUM',
+            "Shot fired outside permitted hunting days or hours",
+            {
+                'timestamp': timestamp.isoformat(),
+                'local_time': in_season[0][1].local(timestamp).isoformat(),
+                'zones': [zone_id for zone_id, _ in in_season],
+            },
+            in_season[0][0],
+        )
+
+
+def check_daily_limit(shots_today, day, license):
+    """``shots_today``: the hunter's shots on the shot's local ``day``, including it"""
+    if license is not None and shots_today > license.max_daily_shots:
+        return Finding(
+            'DAILY_LIMIT', 'MEDIUM',
+            f"Hunter has fired {shots_today} shots on {day}, over the daily limit of {license.max_daily_shots}",
+            {'shots_today': shots_today, 'max_daily_shots': license.max_daily_shots, 'day': day.isoformat()},
+        )
+
+
+def check_license(license, on_date):
+    """``license``: LicenseFacts for the hunter, or None"""
+    if license is None:
+        return Finding(
+            'UNLICENSED', 'CRITICAL',
+            "Hunter has no valid license on record",
+            {'license_number': None},
+        )
+    if license.is_suspended or license.expiry_date < on_date:
+        return Finding(
+            'UNLICENSED', 'CRITICAL',
+            "Hunter license is invalid or expired",
+            {
+                'license_number': license.license_number,
+                'license_expiry': license.expiry_date.isoformat(),
+                'suspended': license.is_suspended,
+            },
+        )
+
+
+def evaluate(latitude, longitude, timestamp, zones, shots_fired, ammo_purchased, license, shots_today, day):
+    """
+    Run every rule for one shot; returns the list of findings.
+    ``zones``: (zone id, ZoneSchedule) of the active zones containing the shot.
+    """
+    findings = [
+        check_ammo(shots_fired, ammo_purchased),
+        check_zone(latitude, longitude, timestamp, zones),
+        check_zone_schedule(timestamp, zones),
+        check_license(license, timestamp.date()),
+        check_daily_limit(shots_today, day, license),
+    ]
+    return [finding for finding in findings if finding is not None]
+
+
+def coalesce_key(hunter_id, violation_type, zone_id, evidence):
+    """
+    Occurrences with the same key are one ongoing condition, recorded on a
+    single open violation. Daily limits are a separate condition each day.
+    """
+    period = evidence.get('day') if violation_type == 'DAILY_LIMIT' else None
+    return (hunter_id, violation_type, zone_id, period)
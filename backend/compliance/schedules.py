@@ -0,0 +1,81 @@
+"""
+Compiled hunting zone schedules
+
+A zone's season, allowed weekdays and daily hours are compiled once into
+a ZoneSchedule of plain integers (date ordinals, a weekday bitmask and
+minutes of the day), so checking whether hunting is allowed at a given
+time is a time zone conversion and a handful of integer comparisons.
+"""
+from collections import namedtuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.utils import timezone
+
+def parse_weekdays(value):
+    """Bitmask of the weekdays in a comma string ('0,1,6'; 0=Monday, 6=Sunday)"""
+    mask = 0
+    for part in (value or '').split(','):
+        part = part.strip()
+        if part.isdigit() and int(part) <= 6:
+            mask |= 1 << int(part)
+    return mask
+
+
+def minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def parse_timezone(name):
+    """ZoneInfo for an IANA name, None for blank; ValueError if unknown"""
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f'Unknown time zone: {name}')
+
+
+class ZoneSchedule(namedtuple('ZoneSchedule', [
+        'season_start', 'season_end', 'weekdays', 'start_minute', 'end_minute', 'tzinfo'])):
+    """
+    Season as date ordinals, weekdays as a bitmask (bit 0 = Monday) and
+    daily hours as minutes of the day, both ends inclusive, in the zone's
+    time zone (``tzinfo``, None for the server time zone). A window whose
+    end is before its start runs past midnight.
+    """
+    __slots__ = ()
+
+    def local(self, dt):
+        """An aware datetime converted to the zone's time zone"""
+        return timezone.localtime(dt, self.tzinfo)
+
+    def in_season(self, day):
+        return self.season_start <= day.toordinal() <= self.season_end
+
+    def allows_weekday(self, weekday):
+        return bool(self.weekdays >> weekday & 1)
+
+    def allows_minute(self, minute):
+        if self.start_minute <= self.end_minute:
+            return self.start_minute <= minute <= self.end_minute
+        return minute >= self.start_minute or minute <= self.end_minute
+
+    def is_open(self, dt):
+        """Whether hunting is allowed at an aware datetime"""
+        local_dt = self.local(dt)
+        return (
+            self.in_season(local_dt.date())
+            and self.allows_weekday(local_dt.weekday())
+            and self.allows_minute(local_dt.hour * 60 + local_dt.minute)
+        )
+
+
+def compile_schedule(zone):
+    """ZoneSchedule for a HuntingZone (or any object with its schedule fields)"""
+    return ZoneSchedule(
+        season_start=zone.season_start.toordinal(),
+        season_end=zone.season_end.toordinal(),
+        weekdays=parse_weekdays(zone.allowed_weekdays),
+        start_minute=minute_of_day(zone.daily_start_time),
+        end_minute=minute_of_day(zone.daily_end_time),
+        tzinfo=parse_timezone(getattr(zone, 'timezone', '')),
+    )
@@ -1,10 +1,19 @@
 from rest_framework import serializers
 from .models import HuntingZone, AmmunitionPurchase, ComplianceViolation, HunterLicense
+from .zone_index import parse_boundary
 
 class HuntingZoneSerializer(serializers.ModelSerializer):
     class Meta:
         model = HuntingZone
         fields = '__all__'
+    
+    def validate_boundary(self, value):
+        if value:
+            try:
+                parse_boundary(value)
+            except (TypeError, ValueError) as e:
+                raise serializers.ValidationError(str(e))
+        return value or None
 
 class AmmunitionPurchaseSerializer(serializers.ModelSerializer):
     hunter_name = serializers.CharField(source='hunter.name', read_only=True)
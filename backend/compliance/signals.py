@@ -1,19 +1,86 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from hunters.models import Shot
-from compliance.views import check_compliance_violations
+from hunters.signals import shots_ingested
+from compliance.models import AmmunitionPurchase, HuntingZone, ComplianceViolation, HunterLicense
+from compliance import balances
+from compliance.daily_counts import daily_counters
+from compliance.evaluator import compliance_queue
+from compliance.license_cache import license_cache
+from compliance.open_violations import open_violations
+from compliance.zone_index import zone_index
+
+@receiver(post_save, sender=Shot)
+def count_shot(sender, instance, created, **kwargs):
+    if created:
+        balances.record_shots([instance])
+        daily_counters.record([instance])
+
+@receiver(shots_ingested, sender=Shot)
+def count_batch(sender, shots, **kwargs):
+    balances.record_shots(shots)
+    daily_counters.record(shots)
+
+@receiver(post_delete, sender=Shot)
+def uncount_shot(sender, instance, **kwargs):
+    balances.unrecord_shot(instance)
+
+@receiver(pre_save, sender=AmmunitionPurchase)
+def remember_purchase(sender, instance, **kwargs):
+    """Keep the stored quantity so an edit only applies the difference"""
+    instance._stored = None
+    if instance.pk:
+        instance._stored = AmmunitionPurchase.objects.filter(pk=instance.pk).values_list(
+            'hunter_id', 'ammo_type', 'quantity'
+        ).first()
+
+@receiver(post_save, sender=AmmunitionPurchase)
+def count_purchase(sender, instance, **kwargs):
+    stored = getattr(instance, '_stored', None)
+    if stored:
+        balances.record_purchase(stored[0], stored[1], -stored[2])
+    balances.record_purchase(instance.hunter_id, instance.ammo_type, instance.quantity)
+
+@receiver(post_delete, sender=AmmunitionPurchase)
+def uncount_purchase(sender, instance, **kwargs):
+    balances.record_purchase(instance.hunter_id, instance.ammo_type, -instance.quantity)
 
 @receiver(post_save, sender=Shot)
 def check_shot_compliance(sender, instance, created, **kwargs):
     """
-    Automatically check for compliance violations when a new shot is recorded
+    Queue new shots for compliance evaluation once they are committed
     """
     if created:  # Only check for new shots, not updates
-        try:
-            violations = check_compliance_violations(instance)
-            if violations:
-                print(f"⚠️  Compliance violations detected for shot by {instance.gun.owner.name}:")
-                for violation in violations:
-                    print(f"   - {violation.get_violation_type_display()}: {violation.description}")
-        except Exception as e:
-            print(f"Error checking compliance for shot {instance.id}: {e}")
\ No newline at end of file
+        shot_id = instance.id
+        transaction.on_commit(lambda: compliance_queue.submit([shot_id]))
+
+@receiver(shots_ingested, sender=Shot)
+def check_batch_compliance(sender, shots, **kwargs):
+    """
+    Queue a bulk-ingested batch of shots for compliance evaluation
+    """
+    shot_ids = [shot.id for shot in shots]
+    transaction.on_commit(lambda: compliance_queue.submit(shot_ids))
+
+@receiver(post_save, sender=HuntingZone)
+@receiver(post_delete, sender=HuntingZone)
+def reload_zone_index(sender, instance, **kwargs):
+    """Zone shapes and active flags are cached in the zone index"""
+    transaction.on_commit(zone_index.invalidate)
+
+@receiver(post_save, sender=HunterLicense)
+@receiver(post_delete, sender=HunterLicense)
+def reload_license_state(sender, instance, **kwargs):
+    """License state is cached per hunter for the license rule"""
+    hunter_id = instance.hunter_id
+    transaction.on_commit(lambda: license_cache.invalidate(hunter_id))
+
+@receiver(post_save, sender=ComplianceViolation)
+def index_violation(sender, instance, **kwargs):
+    """Resolved violations stop coalescing new occurrences"""
+    open_violations.add(instance)
+
+@receiver(post_delete, sender=ComplianceViolation)
+def unindex_violation(sender, instance, **kwargs):
+    open_violations.forget(instance.pk)
@@ -8,6 +8,12 @@ from datetime import timedelta
 from .models import HuntingZone, AmmunitionPurchase, ComplianceViolation, HunterLicense
 from .serializers import HuntingZoneSerializer, AmmunitionPurchaseSerializer, ComplianceViolationSerializer, HunterLicenseSerializer
 from hunters.models import Hunter, Shot
+from .balances import balance_for
+from .zone_index import zone_index
+from .daily_counts import daily_counters, local_day
+from .open_violations import open_violations
+from .license_cache import license_cache
+from . import rules
 
 class HuntingZoneViewSet(viewsets.ModelViewSet):
     queryset = HuntingZone.objects.all()
@@ -15,19 +21,26 @@ class HuntingZoneViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['GET'])
     def active_zones(self, request):
-        """Get currently active hunting zones"""
-        current_time = timezone.now().time()
-        current_day = timezone.now().weekday()
-        
-        active_zones = HuntingZone.objects.filter(
-            is_active=True,
-            allowed_days__contains=str(current_day)
-        ).filter(
-            Q(start_time__lte=current_time) & Q(end_time__gte=current_time)
-        )
+        """Get hunting zones open right now (season, weekday and hours)"""
+        active_zones = zone_index.open_zones(timezone.now())
         
         serializer = self.get_serializer(active_zones, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['GET'])
+    def containing(self, request):
+        """Get active hunting zones containing ?lat=&lng="""
+        try:
+            lat = float(request.query_params['lat'])
+            lng = float(request.query_params['lng'])
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'lat and lng query parameters are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = self.get_serializer(zone_index.zones_containing(lat, lng), many=True)
+        return Response(serializer.data)
 
 class AmmunitionPurchaseViewSet(viewsets.ModelViewSet):
     queryset = AmmunitionPurchase.objects.all()
@@ -102,11 +115,23 @@ class ComplianceViolationViewSet(viewsets.ModelViewSet):
             count=Count('id')
         )
         
+        totals = ComplianceViolation.objects.aggregate(
+            total_violations=Count('id'),
+            total_occurrences=Sum('hit_count')
+        )
+        
         return Response({
             'by_type': list(stats),
             'by_severity': list(severity_stats),
-            'total_violations': ComplianceViolation.objects.count()
+            'total_violations': totals['total_violations'],
+            'total_occurrences': totals['total_occurrences'] or 0
         })
+    
+    @action(detail=False, methods=['GET'])
+    def queue_stats(self, request):
+        """Get depth, throughput and lag of the background compliance queue"""
+        from .evaluator import compliance_queue
+        return Response(compliance_queue.metrics())
 
 class HunterLicenseViewSet(viewsets.ModelViewSet):
     queryset = HunterLicense.objects.all()
@@ -125,10 +150,10 @@ class HunterLicenseViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['GET'])
     def expiring_soon(self, request):
         """Get licenses expiring in the next 30 days"""
-        thirty_days_from_now = timezone.now().date() + timedelta(days=30)
-        expiring_licenses = HunterLicense.objects.filter(
-            expiry_date__lte=thirty_days_from_now,
-            expiry_date__gte=timezone.now().date()
+        today = timezone.now().date()
+        expiring_licenses = HunterLicense.objects.select_related('hunter').filter(
+            expiry_date__lte=today + timedelta(days=30),
+            expiry_date__gte=today
         ).order_by('expiry_date')
         
         serializer = self.get_serializer(expiring_licenses, many=True)
@@ -137,21 +162,22 @@ class HunterLicenseViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['GET'])
     def license_stats(self, request):
         """Get license statistics"""
-        total_licenses = HunterLicense.objects.count()
-        valid_licenses = HunterLicense.objects.filter(is_valid=True).count()
-        expired_licenses = HunterLicense.objects.filter(
-            expiry_date__lt=timezone.now().date()
-        ).count()
+        today = timezone.now().date()
+        licenses = HunterLicense.objects.all()
+        # Separate range counts, each answered from an index: (valid, expiry_date)
+        # for valid licenses, expiry_date for the others. The expiry bound keeps
+        # valid_licenses exact between validity sweeps.
+        stats = {
+            'total_licenses': licenses.count(),
+            'valid_licenses': licenses.filter(valid=True, expiry_date__gte=today).count(),
+            'expired_licenses': licenses.filter(expiry_date__lt=today).count(),
+            'expiring_soon': licenses.filter(
+                expiry_date__lte=today + timedelta(days=30),
+                expiry_date__gte=today
+            ).count(),
+        }
         
-        return Response({
-            'total_licenses': total_licenses,
-            'valid_licenses': valid_licenses,
-            'expired_licenses': expired_licenses,
-            'expiring_soon': HunterLicense.objects.filter(
-                expiry_date__lte=timezone.now().date() + timedelta(days=30),
-                expiry_date__gte=timezone.now().date()
-            ).count()
-        })
+        return Response(stats)
 
 # Violation detection function
 def check_compliance_violations(shot):
@@ -159,80 +185,27 @@ def check_compliance_violations(shot):
     Check for compliance violations when a shot is fired
     This function should be called whenever a new Shot is created
     """
-    violations = []
-    
-    # Check ammunition overuse
     hunter = shot.gun.owner
-    total_shots = Shot.objects.filter(gun__owner=hunter).count()
-    total_purchased = AmmunitionPurchase.objects.filter(hunter=hunter).aggregate(
-        total=Sum('quantity')
-    )['total'] or 0
-    
-    if total_shots > total_purchased:
-        violation = ComplianceViolation.objects.create(
-            hunter=hunter,
-            violation_type='ammo_overuse',
-            severity='high',
-            description=f"Hunter has fired {total_shots} shots but only purchased {total_purchased} rounds",
-            evidence={'shots_fired': total_shots, 'ammo_purchased': total_purchased}
-        )
-        violations.append(violation)
-    
-    # Check hunting zone violations
-    current_time = timezone.now().time()
-    current_day = timezone.now().weekday()
-    
-    # Check if shot location is in any active hunting zone
-    shot_lat, shot_lng = shot.latitude, shot.longitude
-    
-    active_zones = HuntingZone.objects.filter(
-        is_active=True,
-        allowed_days__contains=str(current_day)
-    ).filter(
-        Q(start_time__lte=current_time) & Q(end_time__gte=current_time)
+    # Balance as of the shot: evaluation runs later, after other shots and purchases
+    total_purchased, total_shots = balance_for(shot)
+    matches = zone_index.matches(shot.latitude, shot.longitude)
+    day = local_day(shot.timestamp, matches)
+    
+    findings = rules.evaluate(
+        shot.latitude,
+        shot.longitude,
+        shot.timestamp,
+        zones=[(m.zone.id, m.schedule) for m in matches],
+        shots_fired=total_shots,
+        ammo_purchased=total_purchased,
+        license=license_cache.facts(hunter.id),
+        shots_today=daily_counters.count_for(shot, day),
+        day=day,
     )
     
-    in_valid_zone = False
-    for zone in active_zones:
-        # Simple rectangular zone check (in real implementation, use proper geospatial queries)
-        if (zone.min_latitude <= shot_lat <= zone.max_latitude and
-            zone.min_longitude <= shot_lng <= zone.max_longitude):
-            in_valid_zone = True
-            break
-    
-    if not in_valid_zone:
-        violation = ComplianceViolation.objects.create(
-            hunter=hunter,
-            violation_type='illegal_location',
-            severity='high',
-            description=f"Shot fired outside of permitted hunting zones",
-            evidence={
-                'shot_location': {'lat': shot_lat, 'lng': shot_lng},
-                'timestamp': shot.timestamp.isoformat()
-            }
-        )
-        violations.append(violation)
-    
-    # Check license validity
-    try:
-        license = HunterLicense.objects.get(hunter=hunter)
-        if not license.is_valid:
-            violation = ComplianceViolation.objects.create(
-                hunter=hunter,
-                violation_type='invalid_license',
-                severity='critical',
-                description=f"Hunter license is invalid or expired",
-                evidence={'license_expiry': license.expiry_date.isoformat()}
-            )
-            violations.append(violation)
-    except HunterLicense.DoesNotExist:
-        violation = ComplianceViolation.objects.create(
-            hunter=hunter,
-            violation_type='no_license',
-            severity='critical',
-            description=f"Hunter has no valid license on record",
-            evidence={'hunter_id': hunter.id}
-        )
-        violations.append(violation)
-    
-    return violations
\ No newline at end of file
+    # Repeats of an open condition update its violation instead of adding one
+    violations = [
+        open_violations.record(hunter.id, finding, shot=shot, gun=shot.gun, seen_at=shot.timestamp)
+        for finding in findings
+    ]
+    return [violation for violation in violations if violation is not None]
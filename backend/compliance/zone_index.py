@@ -0,0 +1,196 @@
+"""
+In-memory spatial index of hunting zones
+
+Zones are bucketed into a uniform lat/lng grid by bounding box, so finding
+the zones that contain a point only tests the few zones registered in the
+point's cell, with an exact test for each: great-circle distance for
+center/radius zones, ray casting for polygon boundaries. Each zone's
+schedule is compiled alongside its shape (see ``compliance.schedules``).
+The index is loaded with one query on first use and dropped by the
+HuntingZone save/delete signals in ``compliance.signals``. Signals only
+reach the current process, so an index loaded from the database is also
+reloaded once it is ``ZONE_INDEX_TTL`` seconds old: zone edits made in
+another web worker reach the udp/mqtt ingest processes and other workers
+within that time. Indexes built from given zones (re-audit snapshots)
+never expire.
+"""
+import math
+import threading
+import time
+from django.conf import settings
+from .models import HuntingZone
+from .schedules import compile_schedule
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Zones spanning more cells than this are tested for every point instead
+MAX_CELLS_PER_ZONE = 10000
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometers"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def point_in_polygon(lat, lng, points):
+    """Ray casting test; ``points`` is a list of (lat, lng) vertices"""
+    inside = False
+    j = len(points) - 1
+    for i in range(len(points)):
+        lat_i, lng_i = points[i]
+        lat_j, lng_j = points[j]
+        if (lng_i > lng) != (lng_j > lng):
+            crossing = lat_i + (lng - lng_i) * (lat_j - lat_i) / (lng_j - lng_i)
+            if lat < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+def parse_boundary(boundary):
+    """
+    Validate a polygon boundary and return it as a list of (lat, lng) floats.
+    Raises ValueError for anything that is not at least three valid points.
+    """
+    if not isinstance(boundary, (list, tuple)) or len(boundary) < 3:
+        raise ValueError('Boundary must be a list of at least 3 [lat, lng] points')
+    points = []
+    for point in boundary:
+        if not isinstance(point, (list, tuple)) or len(point) != 2:
+            raise ValueError('Each boundary point must be a [lat, lng] pair')
+        lat, lng = float(point[0]), float(point[1])
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValueError(f'Boundary point {list(point)} is out of range')
+        points.append((lat, lng))
+    return points
+
+
+class IndexedZone:
+    """A zone's shape, bounding box, exact containment test and compiled schedule"""
+
+    def __init__(self, zone):
+        self.zone = zone
+        self.schedule = compile_schedule(zone)
+        self.points = parse_boundary(zone.boundary) if zone.boundary else None
+        if self.points:
+            lats = [lat for lat, _ in self.points]
+            lngs = [lng for _, lng in self.points]
+            self.bbox = (min(lats), min(lngs), max(lats), max(lngs))
+        else:
+            self.center = (float(zone.center_latitude), float(zone.center_longitude))
+            self.radius_km = float(zone.radius_km)
+            dlat = self.radius_km / KM_PER_DEGREE_LAT
+            cos_lat = math.cos(math.radians(self.center[0]))
+            dlng = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+            self.bbox = (
+                max(-90.0, self.center[0] - dlat), max(-180.0, self.center[1] - dlng),
+                min(90.0, self.center[0] + dlat), min(180.0, self.center[1] + dlng),
+            )
+
+    def contains(self, lat, lng):
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        if not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+            return False
+        if self.points:
+            return point_in_polygon(lat, lng, self.points)
+        return haversine_km(lat, lng, *self.center) <= self.radius_km
+
+
+class ZoneIndex:
+    """
+    Thread-safe grid index of HuntingZone shapes
+    """
+
+    def __init__(self, cell_degrees=None):
+        self.cell_degrees = cell_degrees
+        self._lock = threading.Lock()
+        self._index = None  # (cells, large zones, all zones)
+        self._expires_at = None  # time.monotonic() to reload at; None for given zones
+        self.stats = {'loads': 0, 'queries': 0, 'candidates': 0}
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def load(self, zones=None):
+        """
+        Build the index from every zone with a single query, or from
+        ``zones``: any objects with the HuntingZone shape, schedule and
+        is_active fields
+        """
+        if self.cell_degrees is None:
+            self.cell_degrees = settings.ZONE_INDEX_CELL_DEGREES
+        expires_at = None
+        if zones is None:
+            zones = HuntingZone.objects.all()
+            expires_at = time.monotonic() + settings.ZONE_INDEX_TTL
+
+        cells = {}
+        large = []
+        indexed_zones = []
+        for zone in zones:
+            try:
+                indexed = IndexedZone(zone)
+            except (AttributeError, TypeError, ValueError) as e:
+                print(f"Skipping hunting zone {zone.id} with invalid boundary or schedule: {e}")
+                continue
+            indexed_zones.append(indexed)
+            min_lat, min_lng, max_lat, max_lng = indexed.bbox
+            (row0, col0), (row1, col1) = self._cell(min_lat, min_lng), self._cell(max_lat, max_lng)
+            if (row1 - row0 + 1) * (col1 - col0 + 1) > MAX_CELLS_PER_ZONE:
+                large.append(indexed)
+                continue
+            for row in range(row0, row1 + 1):
+                for col in range(col0, col1 + 1):
+                    cells.setdefault((row, col), []).append(indexed)
+
+        index = (cells, large, indexed_zones)
+        with self._lock:
+            self._index = index
+            self._expires_at = expires_at
+            self.stats['loads'] += 1
+        return index
+
+    def _current(self):
+        """The loaded index, (re)loading it when missing or expired"""
+        with self._lock:
+            index, expires_at = self._index, self._expires_at
+        if index is None or (expires_at is not None and time.monotonic() >= expires_at):
+            index = self.load()
+        return index
+
+    def invalidate(self):
+        """Drop the index; the next query reloads it"""
+        with self._lock:
+            self._index = None
+
+    def matches(self, lat, lng, active_only=True):
+        """IndexedZone entries whose boundary contains the point"""
+        cells, large, _ = self._current()
+
+        candidates = cells.get(self._cell(lat, lng), []) + large
+        self.stats['queries'] += 1
+        self.stats['candidates'] += len(candidates)
+        return [
+            indexed for indexed in candidates
+            if (indexed.zone.is_active or not active_only) and indexed.contains(lat, lng)
+        ]
+
+    def zones_containing(self, lat, lng, active_only=True):
+        """HuntingZone instances whose boundary contains the point"""
+        return [indexed.zone for indexed in self.matches(lat, lng, active_only)]
+
+    def open_zones(self, when):
+        """Active zones whose schedule allows hunting at the aware datetime ``when``"""
+        _, _, indexed_zones = self._current()
+        return [
+            indexed.zone for indexed in indexed_zones
+            if indexed.zone.is_active and indexed.schedule.is_open(when)
+        ]
+
+
+zone_index = ZoneIndex()
@@ -5,4 +5,7 @@ from django.apps import AppConfig
 
 class HuntersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'hunters'
\ No newline at end of file
+    name = 'hunters'
+    
+    def ready(self):
+        import hunters.signals
@@ -0,0 +1,92 @@
+"""
+Recent shot event ids, used to drop retried uploads without a DB round trip
+
+Devices attach an ``event_id`` to each shot and reuse it when they retry.
+The database enforces uniqueness of (gun, event_id); this bounded LRU of
+recently accepted keys answers most duplicate checks from memory.
+"""
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from .models import Shot
+
+
+class RecentEventCache:
+    """
+    Thread-safe bounded LRU set of (gun_id, event_id) keys
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_maxsize(self):
+        if self.maxsize is not None:
+            return self.maxsize
+        return settings.SHOT_EVENT_CACHE_SIZE
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        self.update([key])
+
+    def update(self, keys):
+        maxsize = self.get_maxsize()
+        with self._lock:
+            for key in keys:
+                self._keys[key] = None
+                self._keys.move_to_end(key)
+            while len(self._keys) > maxsize:
+                self._keys.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+recent_events = RecentEventCache()
+
+
+def find_duplicates(keys):
+    """
+    Return the subset of (gun_id, event_id) ``keys`` that were already recorded.
+    Keys missing from the cache are checked with a single query.
+    """
+    keys = set(keys)
+    duplicates = {key for key in keys if key in recent_events}
+    unknown = keys - duplicates
+    if unknown:
+        existing = set(Shot.objects.filter(
+            gun_id__in={gun_id for gun_id, _ in unknown},
+            event_id__in={event_id for _, event_id in unknown},
+        ).values_list('gun_id', 'event_id'))
+        found = existing & unknown
+        recent_events.update(found)
+        duplicates |= found
+    return duplicates
+
+
+def is_duplicate(gun_id, event_id):
+    if not event_id:
+        return False
+    return bool(find_duplicates([(gun_id, event_id)]))
+
+
+def remember(shots):
+    """Add the event ids of committed shots to the cache"""
+    recent_events.update(
+        (shot.gun_id, shot.event_id) for shot in shots if shot.event_id
+    )
@@ -0,0 +1,63 @@
+"""
+Compact binary shot frame for datagram ingestion
+
+One frame is a fixed 49-byte big-endian record; a datagram may carry
+several frames back to back.
+
+    offset  size  type     field
+    0       16    char[]   device_id (ASCII, NUL padded)
+    16      4     uint32   seq (per-device counter, for retry detection)
+    20      4     uint32   timestamp (unix seconds, device clock)
+    24      4     float32  sound_level (dB)
+    28      4     float32  vibration_level (Hz)
+    32      8     float64  latitude
+    40      8     float64  longitude
+    48      1     uint8    battery_level (percent)
+"""
+import math
+import struct
+
+SHOT_FRAME = struct.Struct('!16sIIffddB')
+SHOT_FRAME_SIZE = SHOT_FRAME.size
+
+
+def encode_shot_frame(device_id, seq, timestamp, sound_level, vibration_level,
+                      latitude, longitude, battery_level):
+    return SHOT_FRAME.pack(
+        device_id.encode('ascii'),
+        seq & 0xFFFFFFFF,
+        int(timestamp) & 0xFFFFFFFF,
+        sound_level,
+        vibration_level,
+        latitude,
+        longitude,
+        max(0, min(100, int(battery_level))),
+    )
+
+
+def decode_shot_frames(data):
+    """
+    Decode every frame in a datagram.
+    Raises ValueError if the payload is not a whole number of frames.
+    Frames with non-finite readings are skipped.
+    """
+    if not data or len(data) % SHOT_FRAME_SIZE:
+        raise ValueError(f'Datagram length {len(data)} is not a multiple of {SHOT_FRAME_SIZE}')
+
+    frames = []
+    for (device_id, seq, timestamp, sound_level, vibration_level,
+         latitude, longitude, battery_level) in SHOT_FRAME.iter_unpack(data):
+        readings = (sound_level, vibration_level, latitude, longitude)
+        if not all(math.isfinite(value) for value in readings):
+            continue
+        frames.append({
+            'device_id': device_id.rstrip(b'\0').decode('ascii', 'replace'),
+            'seq': seq,
+            'timestamp': timestamp,
+            'sound_level': sound_level,
+            'vibration_level': vibration_level,
+            'latitude': latitude,
+            'longitude': longitude,
+            'battery_level': battery_level,
+        })
+    return frames
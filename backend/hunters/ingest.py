@@ -0,0 +1,164 @@
+"""
+Bulk shot ingestion shared by the device-facing entry points
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Gun, Shot
+from .serializers import ShotIngestSerializer
+from .signals import shots_ingested
+from .dedupe import find_duplicates, remember
+from .registry import registry
+from . import last_seen
+
+
+def ingest_shots(items):
+    """
+    Validate and persist a batch of raw shot payloads.
+
+    Gun references are resolved through the device registry (at most one
+    query for guns it has not cached), the shots are written
+    with one bulk INSERT inside one transaction, and the ``shots_ingested``
+    signal runs once for the whole batch. Gun/owner last-used times go
+    through the write-behind tracker.
+
+    Shots carrying an ``event_id`` that was already recorded for the same
+    gun (a device retry) are skipped and reported in ``duplicates``. A
+    ``timestamp`` (the fire time of a shot uploaded later, within
+    SHOT_MAX_CLOCK_SKEW / SHOT_MAX_AGE_DAYS of now) is stored as the shot's
+    time; shots without one are stamped with the current time.
+
+    The batch is all-or-nothing: if any item is invalid nothing is written
+    and ``errors`` maps the item index to its validation errors. That
+    includes guns deleted by another process after the registry cached them.
+
+    Returns a dict with ``shots`` (created Shot instances), ``duplicates``
+    and ``errors``.
+    """
+    errors = {}
+    validated = []
+
+    for index, item in enumerate(items):
+        serializer = ShotIngestSerializer(data=item)
+        if serializer.is_valid():
+            validated.append((index, serializer.validated_data))
+        else:
+            errors[index] = serializer.errors
+
+    records = registry.by_gun_ids(data['gun'] for _, data in validated)
+    guns = {gun_id: record.to_gun() for gun_id, record in records.items()}
+
+    errors.update(_missing_gun_errors(validated, guns))
+    if errors:
+        return {'shots': [], 'duplicates': [], 'errors': errors}
+
+    shots = []
+    batch_keys = set()
+    duplicates = []
+    for _, data in validated:
+        data = dict(data)
+        gun = guns[data.pop('gun')]
+        if data.get('timestamp') is None:
+            data.pop('timestamp', None)  # Recorded now
+        shot = Shot(gun=gun, **data)
+        if shot.event_id:
+            key = (gun.pk, shot.event_id)
+            if key in batch_keys:
+                # Same event repeated within the batch
+                duplicates.append(key)
+                continue
+            batch_keys.add(key)
+        shots.append(shot)
+
+    try:
+        shots, already_recorded = _insert_new(shots)
+    except IntegrityError:
+        # A gun cached by the registry was deleted by another process, or a
+        # concurrent request recorded some of these events first; the
+        # second pass sees them in the database and skips them.
+        errors = _missing_gun_errors(validated, registry.reload_guns(guns))
+        if errors:
+            return {'shots': [], 'duplicates': [], 'errors': errors}
+        shots, already_recorded = _insert_new(shots)
+    duplicates.extend(already_recorded)
+
+    # Update guns' last_used and owners' last_active (write-behind)
+    now = timezone.now()
+    for gun_id in {shot.gun_id for shot in shots}:
+        last_seen.touch(guns[gun_id], now)
+
+    return {
+        'shots': shots,
+        'duplicates': [{'gun': gun_id, 'event_id': event_id} for gun_id, event_id in duplicates],
+        'errors': {},
+    }
+
+
+def _missing_gun_errors(validated, guns):
+    """Per-item errors for validated items whose gun is not in ``guns``"""
+    return {
+        index: {'gun': [f"Invalid pk \"{data['gun']}\" - object does not exist."]}
+        for index, data in validated
+        if data['gun'] not in guns
+    }
+
+
+def _insert_new(shots):
+    """
+    Bulk insert the shots whose event ids have not been recorded yet.
+    Returns the created shots and the (gun_id, event_id) keys skipped.
+    """
+    keys = [(shot.gun_id, shot.event_id) for shot in shots if shot.event_id]
+    duplicates = find_duplicates(keys) if keys else set()
+    shots = [shot for shot in shots if (shot.gun_id, shot.event_id) not in duplicates]
+
+    if shots:
+        with transaction.atomic():
+            Shot.objects.bulk_create(shots)
+            shots_ingested.send(sender=Shot, shots=shots)
+        remember(shots)
+
+    return shots, [key for key in keys if key in duplicates]
+
+
+def resolve_device_ids(device_ids):
+    """
+    Map IoT device ids to gun ids through the device registry
+    """
+    return {
+        device_id: record.gun_id
+        for device_id, record in registry.by_device_ids(device_ids).items()
+    }
+
+
+def clean_device_status(payload):
+    """
+    Extract the device status fields a gun may report (battery_level,
+    firmware_version) from a raw payload. Invalid values are ignored.
+    """
+    fields = {}
+    if 'battery_level' in payload:
+        try:
+            fields['battery_level'] = max(0, min(100, int(payload['battery_level'])))
+        except (TypeError, ValueError):
+            pass
+    if payload.get('firmware_version') is not None:
+        fields['firmware_version'] = str(payload['firmware_version'])[:20]
+    return fields
+
+
+def save_device_status(statuses):
+    """
+    Write reported device status for many guns at once.
+    ``statuses`` maps gun id to a dict of Gun fields (e.g. battery_level,
+    firmware_version). Guns reporting the same set of fields share one
+    bulk UPDATE that touches only those columns and last_sync.
+    """
+    now = timezone.now()
+    by_fields = {}
+    for gun_id, fields in statuses.items():
+        by_fields.setdefault(frozenset(fields), []).append(
+            Gun(pk=gun_id, last_sync=now, **fields)
+        )
+
+    for fields, guns in by_fields.items():
+        Gun.objects.bulk_update(guns, sorted(fields) + ['last_sync'])
@@ -0,0 +1,136 @@
+"""
+Write-behind coalescing of Gun.last_used / Hunter.last_active updates
+
+Ingest paths call ``touch()`` instead of saving the gun and its owner on
+every shot. Timestamps are kept in memory and written periodically as one
+bulk UPDATE per model that only sets the timestamp column.
+"""
+import atexit
+import threading
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from .models import Hunter, Gun
+
+
+class LastSeenTracker:
+    """
+    In-memory buffer of the latest usage time per gun and per hunter
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._guns = {}
+        self._hunters = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def get_interval(self):
+        if self.interval is not None:
+            return self.interval
+        return settings.LAST_SEEN_FLUSH_INTERVAL
+
+    def touch(self, gun_id, owner_id, when=None):
+        """Record that a gun (and so its owner) was used at ``when``"""
+        when = when or timezone.now()
+        with self._lock:
+            if self._guns.get(gun_id) is None or self._guns[gun_id] < when:
+                self._guns[gun_id] = when
+            if self._hunters.get(owner_id) is None or self._hunters[owner_id] < when:
+                self._hunters[owner_id] = when
+
+        if self.get_interval() <= 0:
+            # Write-through when buffering is disabled
+            self.flush()
+        else:
+            self._ensure_started()
+
+    def flush(self):
+        """
+        Write pending timestamps, one bulk UPDATE per model. Timestamps of
+        a failed write go back to pending for the next flush.
+        """
+        with self._lock:
+            guns, self._guns = self._guns, {}
+            hunters, self._hunters = self._hunters, {}
+
+        try:
+            if guns:
+                Gun.objects.bulk_update(
+                    [Gun(pk=pk, last_used=when) for pk, when in guns.items()],
+                    ['last_used']
+                )
+        except Exception:
+            self._restore(guns, hunters)
+            raise
+        try:
+            if hunters:
+                Hunter.objects.bulk_update(
+                    [Hunter(pk=pk, last_active=when) for pk, when in hunters.items()],
+                    ['last_active']
+                )
+        except Exception:
+            self._restore({}, hunters)
+            raise
+        return len(guns), len(hunters)
+
+    def _restore(self, guns, hunters):
+        """Merge unwritten timestamps back into pending, keeping the newer one"""
+        with self._lock:
+            for pending, unwritten in ((self._guns, guns), (self._hunters, hunters)):
+                for pk, when in unwritten.items():
+                    if pending.get(pk) is None or pending[pk] < when:
+                        pending[pk] = when
+
+    def pending(self):
+        with self._lock:
+            return len(self._guns), len(self._hunters)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='last-seen-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.get_interval()):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing last-seen timestamps: {e}")
+            finally:
+                connections.close_all()
+
+    def stop(self):
+        """Stop the background flusher and write whatever is pending"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.get_interval() + 1)
+        self.flush()
+
+
+tracker = LastSeenTracker()
+
+
+def touch(gun, when=None):
+    """Mark ``gun`` and its owner as used; persisted by the background flusher"""
+    tracker.touch(gun.pk, gun.owner_id, when)
+
+
+def flush():
+    return tracker.flush()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        tracker.flush()
+    except Exception:
+        pass
@@ -0,0 +1,98 @@
+"""
+Management command bridging MQTT shot/status topics into the database
+"""
+import signal
+from django.core.management.base import BaseCommand, CommandError
+from hunters.mqtt_bridge import MQTTIngestBridge, SHOT_TOPIC, STATUS_TOPIC
+from hunters.registry import registry
+
+
+class Command(BaseCommand):
+    help = f'Subscribe to {SHOT_TOPIC} and {STATUS_TOPIC} and persist messages in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost', help='MQTT broker host')
+        parser.add_argument('--port', type=int, default=1883, help='MQTT broker port')
+        parser.add_argument('--client-id', default='iot-dashboard-bridge',
+                            help='Client id; a persistent session keeps unacked messages across restarts')
+        parser.add_argument('--username', default=None)
+        parser.add_argument('--password', default=None)
+        parser.add_argument('--qos', type=int, choices=[0, 1, 2], default=1,
+                            help='Subscription QoS')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Flush as soon as this many shots are pending')
+        parser.add_argument('--flush-interval', type=float, default=0.5,
+                            help='Maximum seconds between flushes')
+        parser.add_argument('--protocol', choices=['5', '3.1.1'], default='5',
+                            help='MQTT protocol version')
+        parser.add_argument('--receive-maximum', type=int, default=None,
+                            help='Unacked messages the broker may have in flight: requested from an MQTT 5 '
+                                 'broker (default: --batch-size); with 3.1.1, set it to the broker\'s '
+                                 'max_inflight_messages (default: 20, mosquitto\'s default)')
+        parser.add_argument('--session-expiry', type=int, default=3600,
+                            help='MQTT 5: seconds the broker keeps unacked messages after a disconnect')
+
+    def handle(self, *args, **options):
+        try:
+            import paho.mqtt.client as mqtt
+        except ImportError:
+            raise CommandError('paho-mqtt is required: pip install paho-mqtt')
+
+        receive_maximum = options['receive_maximum']
+        if options['protocol'] == '5':
+            from paho.mqtt.packettypes import PacketTypes
+            from paho.mqtt.properties import Properties
+
+            receive_maximum = min(receive_maximum or options['batch_size'], 65535)
+            client = mqtt.Client(
+                mqtt.CallbackAPIVersion.VERSION2,
+                client_id=options['client_id'],
+                protocol=mqtt.MQTTv5,
+                manual_ack=True,
+            )
+            properties = Properties(PacketTypes.CONNECT)
+            properties.ReceiveMaximum = receive_maximum
+            properties.SessionExpiryInterval = options['session_expiry']
+            connect_kwargs = {'clean_start': False, 'properties': properties}
+        else:
+            receive_maximum = receive_maximum or 20
+            client = mqtt.Client(
+                mqtt.CallbackAPIVersion.VERSION2,
+                client_id=options['client_id'],
+                clean_session=False,
+                manual_ack=True,
+            )
+            connect_kwargs = {}
+
+        if options['username']:
+            client.username_pw_set(options['username'], options['password'])
+
+        bridge = MQTTIngestBridge(
+            client,
+            qos=options['qos'],
+            batch_size=options['batch_size'],
+            flush_interval=options['flush_interval'],
+            max_inflight=receive_maximum,
+        )
+
+        registry.warm()
+        client.connect(options['host'], options['port'], **connect_kwargs)
+        client.loop_start()
+        signal.signal(signal.SIGTERM, lambda *_: bridge.stop())
+        self.stdout.write(
+            f"Bridging mqtt://{options['host']}:{options['port']} ({SHOT_TOPIC}, {STATUS_TOPIC}), "
+            f"MQTT {options['protocol']}, up to {receive_maximum} unacked messages in flight"
+        )
+        if receive_maximum < options['batch_size']:
+            self.stdout.write(f'Batches are flushed at {receive_maximum} messages, the in-flight limit')
+
+        try:
+            bridge.run()
+        except KeyboardInterrupt:
+            bridge.stop()
+            bridge.flush()
+        finally:
+            client.loop_stop()
+            client.disconnect()
+
+        self.stdout.write(self.style.SUCCESS(f'Stopped. {bridge.stats}'))
@@ -0,0 +1,270 @@
+"""
+Management command to record, synthesize and replay shot/status traces
+against the in-process ASGI application, reporting latency, throughput
+and database queries per endpoint.
+
+Trace files are JSON lines, one request per line:
+
+    {"t": 0.125, "endpoint": "shot", "method": "POST",
+     "path": "/api/hunters/shots/", "body": {...}}
+
+``t`` is the offset in seconds from the start of the trace. Replaying
+writes to the configured database, so point it at a scratch copy.
+"""
+import asyncio
+import contextvars
+import json
+import random
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from hunters.models import Gun, Shot
+
+current_endpoint = contextvars.ContextVar('current_endpoint', default=None)
+
+
+class QueryCounter:
+    """
+    Counts queries per endpoint on every database connection, including the
+    ones Django opens in the worker thread that runs sync views.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        endpoint = current_endpoint.get()
+        if endpoint is not None:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+        return execute(sql, params, many, context)
+
+    def attach(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def install(self):
+        connection_created.connect(self.attach, weak=False)
+        for connection in connections.all():
+            self.attach(connection)
+
+    def uninstall(self):
+        connection_created.disconnect(self.attach)
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+async def call_asgi(app, method, path, body):
+    """Issue one HTTP request to an ASGI app and return the response status"""
+    payload = json.dumps(body).encode() if body is not None else b''
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'localhost'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    request_sent = False
+    response = {}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': payload, 'more_body': False}
+        # Never disconnect; the app stops listening once it has responded
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+
+    await app(scope, receive, send)
+    return response.get('status')
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+class Command(BaseCommand):
+    help = 'Record or synthesize a shot/status trace and replay it against the ASGI app'
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace', help='Trace file (JSON lines)')
+        parser.add_argument('--record', action='store_true',
+                            help='Write a trace from the shots already in the database, then exit')
+        parser.add_argument('--synthesize', type=int, metavar='N',
+                            help='Write a synthetic trace of N events for existing guns, then exit')
+        parser.add_argument('--rate', type=float, default=50.0,
+                            help='Synthetic trace: mean events per second')
+        parser.add_argument('--status-ratio', type=float, default=0.1,
+                            help='Synthetic trace: fraction of events that are status updates')
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help='Replay speed multiplier (e.g. 1, 10, 100)')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['record']:
+            count = self.write_trace(options['trace'], self.recorded_events())
+            self.stdout.write(self.style.SUCCESS(f"Recorded {count} events to {options['trace']}"))
+            return
+        if options['synthesize']:
+            events = self.synthetic_events(options['synthesize'], options['rate'], options['status_ratio'])
+            count = self.write_trace(options['trace'], events)
+            self.stdout.write(self.style.SUCCESS(f"Synthesized {count} events to {options['trace']}"))
+            return
+
+        events = self.read_trace(options['trace'])
+        if not events:
+            raise CommandError('Trace is empty')
+
+        report = self.replay(events, options['speed'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    def shot_event(self, t, gun_id, sound_level, vibration_level, latitude, longitude):
+        return {
+            't': round(t, 6),
+            'endpoint': 'shot',
+            'method': 'POST',
+            'path': '/api/hunters/shots/',
+            'body': {
+                'gun': gun_id,
+                'sound_level': sound_level,
+                'vibration_level': vibration_level,
+                'latitude': latitude,
+                'longitude': longitude,
+                'event_id': uuid.uuid4().hex,
+            },
+        }
+
+    def recorded_events(self):
+        """Replay shape of the shots already stored, in timestamp order"""
+        shots = Shot.objects.order_by('timestamp').values_list(
+            'timestamp', 'gun_id', 'sound_level', 'vibration_level', 'latitude', 'longitude'
+        )
+        start = None
+        for timestamp, *fields in shots.iterator():
+            start = start or timestamp
+            yield self.shot_event((timestamp - start).total_seconds(), *fields)
+
+    def synthetic_events(self, count, rate, status_ratio):
+        guns = list(Gun.objects.filter(status='active').values_list('id', flat=True))
+        if not guns:
+            raise CommandError('No active guns to synthesize a trace for')
+
+        t = 0.0
+        for _ in range(count):
+            t += random.expovariate(rate)
+            gun_id = random.choice(guns)
+            if random.random() < status_ratio:
+                yield {
+                    't': round(t, 6),
+                    'endpoint': 'status',
+                    'method': 'PATCH',
+                    'path': f'/api/hunters/guns/{gun_id}/update_device_status/',
+                    'body': {'battery_level': random.randint(5, 100)},
+                }
+            else:
+                yield self.shot_event(
+                    t, gun_id,
+                    random.uniform(130.0, 160.0),
+                    random.uniform(15.0, 35.0),
+                    40.7128 + random.uniform(-0.01, 0.01),
+                    -74.0060 + random.uniform(-0.01, 0.01),
+                )
+
+    def write_trace(self, path, events):
+        count = 0
+        with open(path, 'w') as f:
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+                count += 1
+        return count
+
+    def read_trace(self, path):
+        try:
+            with open(path) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except OSError as e:
+            raise CommandError(f'Cannot read trace: {e}')
+
+    def replay(self, events, speed):
+        from iot_dashboard.asgi import application
+
+        counter = QueryCounter()
+        counter.install()
+        try:
+            results, elapsed = asyncio.run(self.run_events(application, events, speed))
+        finally:
+            counter.uninstall()
+
+        report = {'speed': speed, 'events': len(events), 'elapsed_s': round(elapsed, 3), 'endpoints': {}}
+        for endpoint, samples in sorted(results.items()):
+            latencies = sorted(latency for latency, _ in samples)
+            errors = sum(1 for _, status in samples if status is None or status >= 400)
+            queries = counter.counts.get(endpoint, 0)
+            report['endpoints'][endpoint] = {
+                'requests': len(samples),
+                'errors': errors,
+                'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2),
+                'queries': queries,
+                'queries_per_request': round(queries / len(samples), 2),
+            }
+        return report
+
+    async def run_events(self, app, events, speed):
+        results = {}
+        started = time.monotonic()
+
+        async def fire(event):
+            delay = event['t'] / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            current_endpoint.set(event['endpoint'])
+            request_started = time.perf_counter()
+            try:
+                status = await call_asgi(app, event['method'], event['path'], event.get('body'))
+            except Exception:
+                status = None
+            results.setdefault(event['endpoint'], []).append(
+                (time.perf_counter() - request_started, status)
+            )
+
+        await asyncio.gather(*(fire(event) for event in events))
+        return results, time.monotonic() - started
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"Replayed {report['events']} events at {report['speed']}x in {report['elapsed_s']}s"
+        )
+        self.stdout.write(
+            f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'q/req':>6}"
+        )
+        for endpoint, stats in report['endpoints'].items():
+            self.stdout.write(
+                f"{endpoint:<10} {stats['requests']:>9} {stats['errors']:>7} "
+                f"{stats['throughput_rps']:>8} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+                f"{stats['p99_ms']:>8} {stats['queries']:>8} {stats['queries_per_request']:>6}"
+            )
@@ -0,0 +1,188 @@
+"""
+Management command running a UDP listener for binary shot frames
+
+While the database is unavailable (OperationalError) a batch is put back
+in front of the pending frames and retried with exponential backoff; new
+frames keep being buffered up to ``--max-pending``. Any other error comes
+from the frames themselves, so the batch is stored one frame at a time and
+only the frames that fail are dropped. Frames rejected by validation are
+dropped from their batch and the rest is stored.
+"""
+import asyncio
+import time
+from collections import deque
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections
+from hunters.frames import decode_shot_frames, SHOT_FRAME_SIZE
+from hunters.ingest import ingest_shots, resolve_device_ids, save_device_status
+from hunters.registry import registry
+
+# Longest wait between retries while the database is unavailable
+MAX_BACKOFF = 30.0
+
+
+class ShotDatagramProtocol(asyncio.DatagramProtocol):
+    """
+    Decodes incoming datagrams into a bounded buffer of shot frames
+    """
+
+    def __init__(self, command):
+        self.command = command
+
+    def datagram_received(self, data, addr):
+        try:
+            frames = decode_shot_frames(data)
+        except ValueError:
+            self.command.stats['malformed'] += 1
+            return
+        self.command.buffer_frames(frames)
+
+
+class Command(BaseCommand):
+    help = 'Listen for binary shot frames over UDP and persist them in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='0.0.0.0', help='Address to bind')
+        parser.add_argument('--port', type=int, default=9999, help='UDP port to listen on')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Flush as soon as this many frames are pending')
+        parser.add_argument('--flush-interval', type=float, default=0.5,
+                            help='Maximum seconds between flushes')
+        parser.add_argument('--max-pending', type=int, default=50000,
+                            help='Oldest frames are dropped beyond this many pending')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.flush_interval = options['flush_interval']
+        self.pending = deque(maxlen=options['max_pending'])
+        self.failures = 0
+        self.retry_at = 0.0
+        self.stats = {'received': 0, 'stored': 0, 'duplicates': 0, 'unknown_device': 0,
+                      'malformed': 0, 'dropped': 0, 'rejected': 0, 'failed_batches': 0}
+
+        registry.warm()
+        self.stdout.write(
+            f"Listening for {SHOT_FRAME_SIZE}-byte shot frames on "
+            f"udp://{options['host']}:{options['port']}"
+        )
+        try:
+            asyncio.run(self.serve(options['host'], options['port']))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Stopped. {self.stats}'))
+
+    async def serve(self, host, port):
+        loop = asyncio.get_running_loop()
+        self.batch_ready = asyncio.Event()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: ShotDatagramProtocol(self), local_addr=(host, port)
+        )
+        try:
+            while True:
+                delay = self.retry_at - time.monotonic()
+                if delay > 0:
+                    # Backing off while the database is unavailable; full
+                    # batches do not cut the wait short
+                    await asyncio.sleep(delay)
+                else:
+                    try:
+                        await asyncio.wait_for(self.batch_ready.wait(), self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                self.batch_ready.clear()
+                while self.pending:
+                    batch = [self.pending.popleft()
+                             for _ in range(min(self.batch_size, len(self.pending)))]
+                    if not await sync_to_async(self.persist_or_requeue)(batch):
+                        break
+        finally:
+            transport.close()
+            if self.pending:
+                await sync_to_async(self.persist_or_requeue)(list(self.pending))
+
+    def persist_or_requeue(self, frames):
+        """Store a batch; returns False when it was put back to retry later"""
+        try:
+            self.persist(frames)
+        except OperationalError as e:
+            return self.requeue(frames, e)
+        except Exception as e:
+            # A bad frame rather than the database: store them one at a time
+            self.stderr.write(f"Error storing batch of {len(frames)} frames, storing them one by one: {e}")
+            for index, frame in enumerate(frames):
+                try:
+                    self.persist([frame])
+                except OperationalError as e:
+                    return self.requeue(frames[index:], e)
+                except Exception as e:
+                    self.stats['rejected'] += 1
+                    self.stderr.write(f"Dropped frame from {frame['device_id']} (seq {frame['seq']}): {e}")
+        self.failures = 0
+        return True
+
+    def requeue(self, frames, error):
+        """Put frames back in front of the pending ones and back off"""
+        self.failures += 1
+        self.stats['failed_batches'] += 1
+        delay = min(self.flush_interval * 2 ** self.failures, MAX_BACKOFF)
+        self.stderr.write(f"Database unavailable storing {len(frames)} frames, retrying in {delay:.1f}s: {error}")
+        room = self.pending.maxlen - len(self.pending)
+        if room < len(frames):
+            self.stats['dropped'] += len(frames) - room
+        self.pending.extendleft(reversed(frames[:room]))
+        self.retry_at = time.monotonic() + delay
+        return False
+
+    def buffer_frames(self, frames):
+        self.stats['received'] += len(frames)
+        overflow = len(self.pending) + len(frames) - self.pending.maxlen
+        if overflow > 0:
+            self.stats['dropped'] += overflow
+        self.pending.extend(frames)
+        if len(self.pending) >= self.batch_size:
+            self.batch_ready.set()
+
+    def persist(self, frames):
+        """Resolve devices and store one batch of frames"""
+        close_old_connections()
+        guns = resolve_device_ids(frame['device_id'] for frame in frames)
+
+        shots = []
+        statuses = {}
+        for frame in frames:
+            gun_id = guns.get(frame['device_id'])
+            if gun_id is None:
+                self.stats['unknown_device'] += 1
+                continue
+            shots.append({
+                'gun': gun_id,
+                'sound_level': frame['sound_level'],
+                'vibration_level': frame['vibration_level'],
+                'latitude': frame['latitude'],
+                'longitude': frame['longitude'],
+                'event_id': f"{frame['timestamp']}-{frame['seq']}",
+            })
+            statuses[gun_id] = {'battery_level': frame['battery_level']}
+
+        if not shots:
+            return
+
+        result = ingest_shots(shots)
+        if result['errors']:
+            # Drop the invalid frames and store the rest of the batch
+            self.stderr.write(f"Rejected {len(result['errors'])} of {len(shots)} shots: {result['errors']}")
+            self.stats['rejected'] += len(result['errors'])
+            shots = [shot for index, shot in enumerate(shots) if index not in result['errors']]
+            if not shots:
+                return
+            result = ingest_shots(shots)
+
+        statuses = {shot['gun']: statuses[shot['gun']] for shot in shots}
+        save_device_status(statuses)
+        self.stats['stored'] += len(result['shots'])
+        self.stats['duplicates'] += len(result['duplicates'])
+        self.stdout.write(
+            f"Stored {len(result['shots'])} shots "
+            f"({len(result['duplicates'])} duplicates) from {len(statuses)} devices"
+        )
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hunters', '0002_migrate_to_gun_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shot',
+            name='event_id',
+            field=models.CharField(blank=True, help_text='Client-supplied event id, unique per gun', max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='shot',
+            constraint=models.UniqueConstraint(fields=('gun', 'event_id'), name='unique_shot_event_per_gun'),
+        ),
+    ]
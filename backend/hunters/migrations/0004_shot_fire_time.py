@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hunters', '0003_shot_event_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shot',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -97,7 +97,9 @@ class Shot(models.Model):
     Shot model representing individual shots fired by IoT-enabled guns
     """
     gun = models.ForeignKey(Gun, on_delete=models.CASCADE, related_name='shots')
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Fire time: reported by the device for uploads from its offline journal,
+    # else the time the shot was recorded
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     
     # Sensor data from IoT device
     sound_level = models.FloatField(help_text='Sound level in dB')
@@ -110,6 +112,10 @@ class Shot(models.Model):
     # Additional metadata
     notes = models.TextField(blank=True)
     
+    # Device-generated id so retried uploads can be recognised and dropped
+    event_id = models.CharField(max_length=64, null=True, blank=True,
+                                help_text='Client-supplied event id, unique per gun')
+    
     def __str__(self):
         return f"Shot from {self.gun.device_id} by {self.gun.owner.name} at {self.timestamp}"
     
@@ -132,4 +138,7 @@ class Shot(models.Model):
         return f"{self.latitude:.4f}, {self.longitude:.4f}"
     
     class Meta:
-        ordering = ['-timestamp']
\ No newline at end of file
+        ordering = ['-timestamp']
+        constraints = [
+            models.UniqueConstraint(fields=['gun', 'event_id'], name='unique_shot_event_per_gun'),
+        ]
\ No newline at end of file
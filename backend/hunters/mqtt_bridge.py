@@ -0,0 +1,310 @@
+"""
+MQTT ingest bridge for gun shot and status topics
+
+Devices publish JSON to ``guns/<device_id>/shot`` and
+``guns/<device_id>/status``. The bridge buffers messages from a single
+subscription and writes them in batches: shots through ``ingest_shots``,
+battery/firmware through ``save_device_status``. QoS 1/2 messages are
+acknowledged only once they have been stored or given up on:
+
+- While the database is unavailable (OperationalError) the batch is kept
+  and retried with backoff, for as long as it takes.
+- Shots ``ingest_shots`` rejects (invalid, or for a gun deleted meanwhile)
+  are dead-lettered and the rest of the batch is stored.
+- Any other error retries the whole batch up to ``max_attempts`` times;
+  after that its messages are stored one at a time and each one that still
+  fails is dead-lettered.
+
+Dead-lettered messages are logged and acknowledged, so one bad message
+cannot hold up the ones batched with it. Event ids drop the repeats of
+messages the broker redelivers.
+
+Unacknowledged messages count against the broker's in-flight window for
+the connection (MQTT 5 Receive Maximum, or mosquitto's
+``max_inflight_messages``, 20 by default, for MQTT 3.1.1). The broker stops
+delivering once it is full, so the bridge flushes as soon as
+``max_inflight`` messages are pending: a batch is at most that large,
+whatever ``batch_size`` says.
+
+The bridge only needs the small part of the paho-mqtt client API it uses
+(``on_connect``, ``on_message``, ``subscribe``, ``ack``), so it can run
+against ``InMemoryBroker`` locally without a real broker.
+"""
+import json
+import threading
+import time
+from django.db import OperationalError, close_old_connections
+from .serializers import ShotIngestSerializer
+from .ingest import ingest_shots, resolve_device_ids, clean_device_status, save_device_status
+
+TOPIC_PREFIX = 'guns'
+SHOT_TOPIC = f'{TOPIC_PREFIX}/+/shot'
+STATUS_TOPIC = f'{TOPIC_PREFIX}/+/status'
+
+# Longest wait between retries while the database is unavailable
+MAX_BACKOFF = 30.0
+
+
+class MQTTIngestBridge:
+    """
+    Buffers shot/status messages from an MQTT client and persists them in batches
+    """
+
+    def __init__(self, client, qos=1, batch_size=500, flush_interval=0.5, max_inflight=None, max_attempts=3):
+        self.client = client
+        self.qos = qos
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_inflight = max_inflight
+        self.max_attempts = max_attempts
+        self.stats = {'received': 0, 'stored': 0, 'duplicates': 0,
+                      'status_updates': 0, 'invalid': 0, 'unknown_device': 0,
+                      'failed_flushes': 0, 'dead_lettered': 0}
+        self._failures = 0
+        self._retry_at = 0.0
+
+        self._lock = threading.Lock()
+        self._shots = []  # (device_id, validated shot, ack or None)
+        self._statuses = {}
+        self._acks = []  # Acks of status and invalid messages
+        self._batch_ready = threading.Event()
+        self._stop = threading.Event()
+
+        client.on_connect = self.on_connect
+        client.on_message = self.on_message
+
+    def on_connect(self, client, userdata, flags, reason_code, properties=None):
+        client.subscribe([(SHOT_TOPIC, self.qos), (STATUS_TOPIC, self.qos)])
+
+    def on_message(self, client, userdata, message):
+        """Parse and buffer one message; acked once it is stored or dead-lettered"""
+        self.stats['received'] += 1
+        parts = message.topic.split('/')
+        payload = self.parse_payload(message.payload)
+        ack = (message.mid, message.qos) if message.qos > 0 else None
+
+        valid = len(parts) == 3 and parts[0] == TOPIC_PREFIX and payload is not None
+        kind = parts[2] if valid else None
+
+        with self._lock:
+            if kind == 'shot' and self.buffer_shot(parts[1], payload, ack):
+                pass
+            elif kind == 'status':
+                status = clean_device_status(payload)
+                if status:
+                    self._statuses.setdefault(parts[1], {}).update(status)
+                self.buffer_ack(ack)
+            else:
+                self.stats['invalid'] += 1
+                self.buffer_ack(ack)
+
+            if len(self._shots) >= self.batch_size or self.window_full():
+                self._batch_ready.set()
+
+    def buffer_ack(self, ack):
+        if ack is not None:
+            self._acks.append(ack)
+
+    def window_full(self):
+        """Whether the broker's in-flight window is used up by unacked messages"""
+        if self.max_inflight is None:
+            return False
+        inflight = len(self._acks) + sum(1 for _, _, ack in self._shots if ack is not None)
+        return inflight >= self.max_inflight
+
+    def parse_payload(self, raw):
+        try:
+            payload = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        return payload if isinstance(payload, dict) else None
+
+    def buffer_shot(self, device_id, payload, ack):
+        """Validate and buffer a shot; returns False for an invalid one"""
+        # Validate up front so one bad message cannot reject the whole batch;
+        # the gun is resolved per batch, so any placeholder id passes here.
+        serializer = ShotIngestSerializer(data=dict(payload, gun=1))
+        if not serializer.is_valid():
+            return False
+        shot = dict(serializer.validated_data)
+        shot.pop('gun')
+        self._shots.append((device_id, shot, ack))
+        return True
+
+    def flush(self):
+        """Persist buffered messages, then acknowledge them"""
+        with self._lock:
+            shots, self._shots = self._shots, []
+            statuses, self._statuses = self._statuses, {}
+            acks, self._acks = self._acks, []
+
+        if shots or statuses:
+            close_old_connections()
+            try:
+                if self._failures >= self.max_attempts:
+                    self.persist_each(shots, statuses)
+                else:
+                    self.persist(shots, statuses)
+            except Exception as e:
+                self.stats['failed_flushes'] += 1
+                self._failures += 1
+                print(f"Error persisting MQTT batch of {len(shots)} shots (attempt {self._failures}): {e}")
+                if isinstance(e, OperationalError):
+                    # Database unavailable: back off instead of retrying at once
+                    self._retry_at = time.monotonic() + min(
+                        self.flush_interval * 2 ** self._failures, MAX_BACKOFF
+                    )
+                self.requeue(shots, statuses, acks)
+                return
+            self._failures = 0
+
+        acks.extend(ack for _, _, ack in shots if ack is not None)
+        for mid, qos in acks:
+            self.client.ack(mid, qos)
+
+    def requeue(self, shots, statuses, acks):
+        """Put a failed batch back in front of what arrived meanwhile"""
+        with self._lock:
+            self._shots = shots + self._shots
+            for device_id, fields in statuses.items():
+                self._statuses[device_id] = dict(fields, **self._statuses.get(device_id, {}))
+            self._acks = acks + self._acks
+
+    def persist_each(self, shots, statuses):
+        """
+        Store messages one at a time, dead-lettering those that fail.
+        An OperationalError still fails the whole batch, to be retried.
+        """
+        for device_id, shot, ack in shots:
+            try:
+                self.persist([(device_id, shot, ack)], {})
+            except OperationalError:
+                raise
+            except Exception as e:
+                self.dead_letter(device_id, shot, e)
+        try:
+            self.persist([], statuses)
+        except OperationalError:
+            raise
+        except Exception as e:
+            print(f"Dropped MQTT status updates for {len(statuses)} devices: {e}")
+
+    def dead_letter(self, device_id, shot, error):
+        """Give up on a shot message; it is acknowledged with the rest"""
+        self.stats['dead_lettered'] += 1
+        print(f"Dead-lettered MQTT shot from {device_id} (event {shot.get('event_id')}): {error}")
+
+    def persist(self, shots, statuses):
+        guns = resolve_device_ids(
+            [device_id for device_id, _, _ in shots] + list(statuses)
+        )
+
+        items = []
+        for device_id, shot, _ in shots:
+            if device_id not in guns:
+                self.stats['unknown_device'] += 1
+                continue
+            items.append((device_id, dict(shot, gun=guns[device_id])))
+
+        if items:
+            result = ingest_shots([item for _, item in items])
+            while result['errors']:
+                # Dead-letter the rejected shots and store the rest
+                for index, errors in result['errors'].items():
+                    self.dead_letter(items[index][0], items[index][1], errors)
+                items = [item for index, item in enumerate(items) if index not in result['errors']]
+                result = ingest_shots([item for _, item in items])
+            self.stats['stored'] += len(result['shots'])
+            self.stats['duplicates'] += len(result['duplicates'])
+
+        known_statuses = {
+            guns[device_id]: fields
+            for device_id, fields in statuses.items()
+            if device_id in guns and fields
+        }
+        if known_statuses:
+            save_device_status(known_statuses)
+            self.stats['status_updates'] += len(known_statuses)
+
+    def run(self):
+        """Flush on every full batch or flush interval until ``stop()`` is called"""
+        while not self._stop.is_set():
+            delay = self._retry_at - time.monotonic()
+            if delay > 0:
+                # Backing off after the database was unavailable
+                self._stop.wait(delay)
+                continue
+            self._batch_ready.wait(self.flush_interval)
+            self._batch_ready.clear()
+            self.flush()
+        self.flush()
+
+    def stop(self):
+        self._stop.set()
+        self._batch_ready.set()
+
+
+def topic_matches(subscription, topic):
+    """MQTT topic filter matching with + and # wildcards"""
+    sub_parts = subscription.split('/')
+    topic_parts = topic.split('/')
+    for index, part in enumerate(sub_parts):
+        if part == '#':
+            return True
+        if index >= len(topic_parts):
+            return False
+        if part != '+' and part != topic_parts[index]:
+            return False
+    return len(sub_parts) == len(topic_parts)
+
+
+class InMemoryMessage:
+    def __init__(self, topic, payload, qos, mid):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.mid = mid
+
+
+class InMemoryBroker:
+    """
+    Local stand-in for an MQTT broker and paho client.
+    ``publish`` delivers synchronously to matching subscriptions; QoS>0
+    messages stay in ``unacked`` until the subscriber acknowledges them.
+    """
+
+    def __init__(self):
+        self.on_connect = None
+        self.on_message = None
+        self.subscriptions = []
+        self.unacked = {}
+        self._next_mid = 1
+
+    def connect(self, *args, **kwargs):
+        if self.on_connect:
+            self.on_connect(self, None, {}, 0, None)
+
+    def subscribe(self, topics):
+        self.subscriptions.extend(topic for topic, _ in topics)
+
+    def publish(self, topic, payload, qos=1):
+        if not any(topic_matches(sub, topic) for sub in self.subscriptions):
+            return None
+        message = InMemoryMessage(topic, payload, qos, self._next_mid)
+        self._next_mid += 1
+        if qos > 0:
+            self.unacked[message.mid] = message
+        self.on_message(self, None, message)
+        return message.mid
+
+    def ack(self, mid, qos):
+        self.unacked.pop(mid, None)
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        pass
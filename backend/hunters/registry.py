@@ -0,0 +1,168 @@
+"""
+In-process device registry: device_id / gun id -> gun and owner essentials
+
+Ingest paths resolve devices and guns here instead of querying Gun and
+then dereferencing ``gun.owner``. The registry is loaded with one query
+on first use (or by calling ``warm()``) and kept current by the Gun/Hunter
+save and delete signals in ``hunters.signals``. Signals only reach the
+current process, so the whole registry is also reloaded once it is
+``DEVICE_REGISTRY_TTL`` seconds old: guns deleted, deactivated, moved to
+another device id or owner in another process (a web worker, for
+udp_ingest and mqtt_bridge) show up within that time.
+"""
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from .models import Hunter, Gun
+
+
+def _from_db(model, values):
+    """
+    Instantiate a model with only ``values`` loaded. ``Model.from_db``
+    takes the values in the model's field order, not the given names' order.
+    """
+    field_names = [f.attname for f in model._meta.concrete_fields if f.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+
+
+class DeviceRecord(namedtuple('DeviceRecord', [
+        'gun_id', 'device_id', 'owner_id', 'weapon_type', 'status', 'caliber',
+        'owner_name', 'owner_active', 'owner_latitude', 'owner_longitude'])):
+    """
+    Cached essentials of a gun and its owner
+    """
+    __slots__ = ()
+
+    def to_gun(self):
+        """
+        Build a Gun with its owner attached, without querying.
+        Only the cached fields are loaded; any other field is deferred and
+        fetched on access, and save() only writes the loaded fields.
+        """
+        gun = _from_db(Gun, {
+            'id': self.gun_id, 'device_id': self.device_id, 'owner_id': self.owner_id,
+            'weapon_type': self.weapon_type, 'status': self.status, 'caliber': self.caliber,
+        })
+        gun.owner = _from_db(Hunter, {
+            'id': self.owner_id, 'name': self.owner_name, 'is_active': self.owner_active,
+            'latitude': self.owner_latitude, 'longitude': self.owner_longitude,
+        })
+        return gun
+
+
+class DeviceRegistry:
+    """
+    Thread-safe cache of DeviceRecord keyed by device id and gun id
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_device = {}
+        self._by_gun = {}
+        self._warmed = False
+        self._expires_at = 0.0
+
+    def _query(self, **filters):
+        rows = Gun.objects.filter(**filters).values_list(
+            'id', 'device_id', 'owner_id', 'weapon_type', 'status', 'caliber',
+            'owner__name', 'owner__is_active', 'owner__latitude', 'owner__longitude',
+        )
+        return [DeviceRecord(*row) for row in rows]
+
+    def _store(self, records):
+        with self._lock:
+            for record in records:
+                self._by_device[record.device_id] = record
+                self._by_gun[record.gun_id] = record
+
+    def warm(self):
+        """Load every gun with a single query"""
+        records = self._query()
+        with self._lock:
+            self._by_device = {record.device_id: record for record in records}
+            self._by_gun = {record.gun_id: record for record in records}
+            self._warmed = True
+            self._expires_at = time.monotonic() + settings.DEVICE_REGISTRY_TTL
+
+    def _ensure_warm(self):
+        if not self._warmed or time.monotonic() >= self._expires_at:
+            self.warm()
+
+    def by_device_ids(self, device_ids):
+        """Map device ids to records; misses are loaded with one query"""
+        self._ensure_warm()
+        device_ids = set(device_ids)
+        found = {d: self._by_device[d] for d in device_ids if d in self._by_device}
+        missing = device_ids - found.keys()
+        if missing:
+            records = self._query(device_id__in=missing)
+            self._store(records)
+            found.update((record.device_id, record) for record in records)
+        return found
+
+    def by_gun_ids(self, gun_ids):
+        """Map gun ids to records; misses are loaded with one query"""
+        self._ensure_warm()
+        gun_ids = set(gun_ids)
+        found = {g: self._by_gun[g] for g in gun_ids if g in self._by_gun}
+        missing = gun_ids - found.keys()
+        if missing:
+            records = self._query(pk__in=missing)
+            self._store(records)
+            found.update((record.gun_id, record) for record in records)
+        return found
+
+    def get_device(self, device_id):
+        return self.by_device_ids([device_id]).get(device_id)
+
+    def get_gun(self, gun_id):
+        return self.by_gun_ids([gun_id]).get(gun_id)
+
+    def active_guns(self):
+        """Records of all guns with status 'active'"""
+        self._ensure_warm()
+        with self._lock:
+            records = list(self._by_gun.values())
+        return [record for record in records if record.status == 'active']
+
+    def invalidate_gun(self, gun_id):
+        with self._lock:
+            record = self._by_gun.pop(gun_id, None)
+            if record is not None:
+                self._by_device.pop(record.device_id, None)
+
+    def invalidate_owner(self, owner_id):
+        with self._lock:
+            for record in [r for r in self._by_gun.values() if r.owner_id == owner_id]:
+                self._by_gun.pop(record.gun_id, None)
+                self._by_device.pop(record.device_id, None)
+
+    def reload_gun(self, gun_id):
+        """Drop and re-read one gun so a changed device_id or status shows up at once"""
+        self.invalidate_gun(gun_id)
+        if self._warmed:
+            self._store(self._query(pk=gun_id))
+
+    def reload_guns(self, gun_ids):
+        """Re-read guns that may have changed elsewhere; returns records of those that still exist"""
+        gun_ids = set(gun_ids)
+        for gun_id in gun_ids:
+            self.invalidate_gun(gun_id)
+        return self.by_gun_ids(gun_ids)
+
+    def reload_owner(self, owner_id):
+        """Drop and re-read every gun of one owner"""
+        self.invalidate_owner(owner_id)
+        if self._warmed:
+            self._store(self._query(owner_id=owner_id))
+
+    def clear(self):
+        with self._lock:
+            self._by_device = {}
+            self._by_gun = {}
+            self._warmed = False
+
+
+registry = DeviceRegistry()
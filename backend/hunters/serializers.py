@@ -1,6 +1,9 @@
 """
 Hunters app serializers
 """
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Hunter, Gun, Shot
 
@@ -47,8 +50,40 @@ class ShotSerializer(serializers.ModelSerializer):
         model = Shot
         fields = ['id', 'gun', 'gun_device_id', 'hunter_name', 'timestamp', 'location', 
                  'sound_level', 'vibration_level', 'latitude', 'longitude', 
-                 'weapon_used', 'notes']
+                 'weapon_used', 'notes', 'event_id']
         read_only_fields = ['timestamp', 'location', 'hunter_name', 'weapon_used', 'gun_device_id']
+    
+    def validate_event_id(self, value):
+        # Store missing ids as NULL so they never collide in the unique index
+        return value or None
+
+class ShotIngestSerializer(serializers.Serializer):
+    """
+    Shot payload serializer for bulk ingestion.
+    Validates field values only; gun references are resolved by the caller
+    in one query for the whole batch.
+    """
+    gun = serializers.IntegerField(min_value=1)
+    sound_level = serializers.FloatField()
+    vibration_level = serializers.FloatField()
+    latitude = serializers.FloatField()
+    longitude = serializers.FloatField()
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+    event_id = serializers.CharField(max_length=64, required=False, allow_null=True, default=None)
+    # Fire time for shots uploaded after the fact; the upload time when omitted
+    timestamp = serializers.DateTimeField(required=False, allow_null=True, default=None)
+
+    def validate_timestamp(self, value):
+        if value is None:
+            return value
+        now = timezone.now()
+        if value > now + timedelta(seconds=settings.SHOT_MAX_CLOCK_SKEW):
+            raise serializers.ValidationError('Shot time is in the future.')
+        if value < now - timedelta(days=settings.SHOT_MAX_AGE_DAYS):
+            raise serializers.ValidationError(
+                f'Shot time is more than {settings.SHOT_MAX_AGE_DAYS} days old.'
+            )
+        return value
 
 class HunterStatsSerializer(serializers.Serializer):
     """
@@ -0,0 +1,29 @@
+"""
+Hunters app signals
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from .models import Hunter, Gun
+from .registry import registry
+
+# Sent once per bulk-ingested batch, after the shots have been inserted.
+# Receivers get ``shots``: the list of created Shot instances with ``gun``
+# and ``gun.owner`` already loaded. ``bulk_create`` does not fire post_save,
+# so anything that reacts to new shots must also listen to this signal.
+shots_ingested = Signal()
+
+
+@receiver(post_save, sender=Gun)
+def refresh_registry_gun(sender, instance, **kwargs):
+    """Keep the device registry in step with saved guns"""
+    transaction.on_commit(lambda: registry.reload_gun(instance.pk))
+
+@receiver(post_delete, sender=Gun)
+def drop_registry_gun(sender, instance, **kwargs):
+    registry.invalidate_gun(instance.pk)
+
+@receiver(post_save, sender=Hunter)
+def refresh_registry_owner(sender, instance, **kwargs):
+    """Owner name and active flag are cached with each of their guns"""
+    transaction.on_commit(lambda: registry.reload_owner(instance.pk))
@@ -4,13 +4,18 @@ Hunters app views
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiResponse, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 from .models import Hunter, Gun, Shot
-from .serializers import HunterSerializer, GunSerializer, ShotSerializer, HunterStatsSerializer
+from .serializers import HunterSerializer, GunSerializer, ShotSerializer, ShotIngestSerializer, HunterStatsSerializer
+from .ingest import ingest_shots
+from .dedupe import is_duplicate, remember
+from . import last_seen
 
 @extend_schema_view(
     list=extend_schema(
@@ -206,7 +211,7 @@ class GunViewSet(viewsets.ModelViewSet):
         """
         Filter guns by owner if provided
         """
-        queryset = Gun.objects.all().order_by('-created_at')
+        queryset = Gun.objects.all().order_by('-registered_date')
         owner_id = self.request.query_params.get('owner', None)
         if owner_id is not None:
             queryset = queryset.filter(owner_id=owner_id)
@@ -239,14 +244,22 @@ class GunViewSet(viewsets.ModelViewSet):
         
         serializer = ShotSerializer(data=shot_data)
         if serializer.is_valid():
-            shot = serializer.save()
+            event_id = serializer.validated_data.get('event_id')
+            if is_duplicate(gun.id, event_id):
+                return duplicate_shot_response(gun.id, event_id)
             
-            # Update gun's last_used and owner's last_active
-            gun.last_used = timezone.now()
-            gun.save()
+            try:
+                with transaction.atomic():
+                    shot = serializer.save()
+            except IntegrityError:
+                # A concurrent retry recorded the same event first
+                if event_id and is_duplicate(gun.id, event_id):
+                    return duplicate_shot_response(gun.id, event_id)
+                raise
+            remember([shot])
             
-            gun.owner.last_active = timezone.now()
-            gun.owner.save()
+            # Update gun's last_used and owner's last_active (write-behind)
+            last_seen.touch(gun)
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -296,6 +309,15 @@ class GunViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(low_battery_guns, many=True)
         return Response(serializer.data)
 
+def duplicate_shot_response(gun_id, event_id):
+    """
+    Response for a retried shot whose event id was already recorded
+    """
+    return Response(
+        {'gun': gun_id, 'event_id': event_id, 'duplicate': True},
+        status=status.HTTP_200_OK
+    )
+
 class ShotViewSet(viewsets.ModelViewSet):
     """
     Shot CRUD operations
@@ -303,6 +325,31 @@ class ShotViewSet(viewsets.ModelViewSet):
     queryset = Shot.objects.all()
     serializer_class = ShotSerializer
     
+    def create(self, request, *args, **kwargs):
+        """
+        Record a shot; a retry carrying an already recorded event_id returns 200
+        without creating another shot
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        gun = serializer.validated_data['gun']
+        event_id = serializer.validated_data.get('event_id')
+        if is_duplicate(gun.id, event_id):
+            return duplicate_shot_response(gun.id, event_id)
+        
+        try:
+            with transaction.atomic():
+                self.perform_create(serializer)
+        except IntegrityError:
+            # A concurrent retry recorded the same event first
+            if event_id and is_duplicate(gun.id, event_id):
+                return duplicate_shot_response(gun.id, event_id)
+            raise
+        remember([serializer.instance])
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+    
     def get_queryset(self):
         """
         Filter shots by hunter if provided
@@ -313,6 +360,63 @@ class ShotViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(hunter_id=hunter_id)
         return queryset
     
+    @extend_schema(
+        summary="Bulk Record Shots",
+        description="Record a batch of shots in a single request. Accepts a JSON list of shots "
+                    "or an object with a `shots` list. The batch is written in one transaction; "
+                    "if any shot is invalid nothing is recorded and errors are returned by index. "
+                    "Shots whose `event_id` was already recorded for the gun are skipped and "
+                    "listed under `duplicates`.",
+        request=ShotIngestSerializer(many=True),
+        responses={
+            201: OpenApiResponse(
+                response=OpenApiTypes.OBJECT,
+                description="Shots recorded successfully",
+                examples=[
+                    OpenApiExample(
+                        'Bulk Response',
+                        value={'created': 3, 'ids': [101, 102, 103], 'duplicates': []}
+                    )
+                ]
+            ),
+            400: OpenApiResponse(
+                response=OpenApiTypes.OBJECT,
+                description="Invalid batch; errors keyed by shot index"
+            )
+        },
+        tags=['Shots', 'IoT']
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Record many shots at once with a single bulk insert
+        """
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('shots')
+        
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Expected a non-empty list of shots'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(items) > settings.SHOT_INGEST_MAX_BATCH:
+            return Response(
+                {'error': f'Batch too large (max {settings.SHOT_INGEST_MAX_BATCH} shots)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        result = ingest_shots(items)
+        if result['errors']:
+            return Response({'errors': result['errors']}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'created': len(result['shots']),
+            'ids': [shot.id for shot in result['shots']],
+            'duplicates': result['duplicates'],
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['get'])
     def recent(self, request):
         """
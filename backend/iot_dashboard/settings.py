@@ -4,7 +4,7 @@ Django settings for IoT Dashboard project.
 
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 
 CORS_ALLOW_ALL_ORIGINS = True
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -158,12 +158,92 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Only for development
 
-# Channels settings (using in-memory for development)
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
+# Shot ingestion
+SHOT_INGEST_MAX_BATCH = config('SHOT_INGEST_MAX_BATCH', default=1000, cast=int)
+# Bounds on device-reported fire times: seconds ahead of the server clock, and
+# days back (how long a device may hold shots in its offline journal)
+SHOT_MAX_CLOCK_SKEW = config('SHOT_MAX_CLOCK_SKEW', default=300, cast=int)
+SHOT_MAX_AGE_DAYS = config('SHOT_MAX_AGE_DAYS', default=30, cast=int)
+# Seconds between write-behind flushes of Gun.last_used / Hunter.last_active (0 = write-through)
+LAST_SEEN_FLUSH_INTERVAL = config('LAST_SEEN_FLUSH_INTERVAL', default=5.0, cast=float)
+# Seconds before the in-process device registry is reloaded, so gun changes made
+# by other processes are picked up
+DEVICE_REGISTRY_TTL = config('DEVICE_REGISTRY_TTL', default=60.0, cast=float)
+# Number of recent (gun, event_id) keys kept in memory to reject retried shots
+SHOT_EVENT_CACHE_SIZE = config('SHOT_EVENT_CACHE_SIZE', default=100000, cast=int)
+
+# Device WebSocket ingestion: shots per acknowledged batch and max seconds between flushes
+DEVICE_WS_BATCH_SIZE = config('DEVICE_WS_BATCH_SIZE', default=100, cast=int)
+DEVICE_WS_FLUSH_INTERVAL = config('DEVICE_WS_FLUSH_INTERVAL', default=1.0, cast=float)
+
+# Compliance: grid cell size in degrees for the in-memory hunting zone index
+ZONE_INDEX_CELL_DEGREES = config('ZONE_INDEX_CELL_DEGREES', default=0.1, cast=float)
+# Compliance: seconds before the zone index is reloaded, so zone edits made by
+# other processes are picked up
+ZONE_INDEX_TTL = config('ZONE_INDEX_TTL', default=60.0, cast=float)
+# Compliance: seconds a cached hunter license state is trusted before it is read
+# again, so licenses changed by another process are picked up
+LICENSE_CACHE_TTL = config('LICENSE_CACHE_TTL', default=60.0, cast=float)
+
+# Compliance evaluation queue: evaluate inline when eager, else in a background
+# worker in batches; producers evaluate their own shots when the queue is full
+COMPLIANCE_QUEUE_EAGER = config('COMPLIANCE_QUEUE_EAGER', default=False, cast=bool)
+COMPLIANCE_QUEUE_MAX_DEPTH = config('COMPLIANCE_QUEUE_MAX_DEPTH', default=10000, cast=int)
+COMPLIANCE_QUEUE_BATCH_SIZE = config('COMPLIANCE_QUEUE_BATCH_SIZE', default=200, cast=int)
+
+# Sensor feed (ws/sensors/): one broadcaster publishes the newest readings every
+# interval (in-process with the in-memory layer, else run_feed_producers); the
+# simulator inserts fake readings each tick
+SENSOR_BROADCAST_INTERVAL = config('SENSOR_BROADCAST_INTERVAL', default=3.0, cast=float)
+SENSOR_SIMULATOR = config('SENSOR_SIMULATOR', default=False, cast=bool)
+
+# Shot feed (ws/shots/): committed shots are published in batches every interval
+# (0 = publish on commit); the simulator records a random shot every interval
+SHOT_FEED_FLUSH_INTERVAL = config('SHOT_FEED_FLUSH_INTERVAL', default=0.25, cast=float)
+SHOT_FEED_MAX_BATCH = config('SHOT_FEED_MAX_BATCH', default=500, cast=int)
+SHOT_SIMULATOR = config('SHOT_SIMULATOR', default=False, cast=bool)
+SHOT_SIMULATOR_INTERVAL = config('SHOT_SIMULATOR_INTERVAL', default=10.0, cast=float)
+
+# Grid cell size in degrees of the per-area groups behind WebSocket bbox filters
+FEED_CELL_DEGREES = config('FEED_CELL_DEGREES', default=0.5, cast=float)
+
+# Channels settings: in-memory for development (one process only). Set
+# CHANNEL_REDIS_HOSTS to one or more comma-separated redis:// URLs to share
+# channels and groups between ASGI workers; they are sharded across the hosts.
+# CHANNEL_LAYER_BACKEND: memory, redis, or redis-pubsub (Redis pub/sub layer)
+CHANNEL_REDIS_HOSTS = config('CHANNEL_REDIS_HOSTS', default='', cast=Csv())
+CHANNEL_LAYER_BACKEND = config('CHANNEL_LAYER_BACKEND', default='redis' if CHANNEL_REDIS_HOSTS else 'memory')
+CHANNEL_LAYER_BACKENDS = {
+    'memory': 'channels.layers.InMemoryChannelLayer',
+    'redis': 'channels_redis.core.RedisChannelLayer',
+    'redis-pubsub': 'channels_redis.pubsub.RedisPubSubChannelLayer',
 }
+if CHANNEL_LAYER_BACKEND not in CHANNEL_LAYER_BACKENDS:
+    raise ValueError(f'Unknown CHANNEL_LAYER_BACKEND: {CHANNEL_LAYER_BACKEND}')
+if CHANNEL_LAYER_BACKEND == 'memory':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': CHANNEL_LAYER_BACKENDS['memory'],
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': CHANNEL_LAYER_BACKENDS[CHANNEL_LAYER_BACKEND],
+            'CONFIG': {
+                'hosts': CHANNEL_REDIS_HOSTS or ['redis://localhost:6379/0'],
+                'prefix': config('CHANNEL_LAYER_PREFIX', default='iot_dashboard'),
+            },
+        },
+    }
+    if CHANNEL_LAYER_BACKEND == 'redis':
+        CHANNEL_LAYERS['default']['CONFIG'].update({
+            # Messages buffered per channel, and seconds before unread messages
+            # and stale group memberships expire
+            'capacity': config('CHANNEL_LAYER_CAPACITY', default=1000, cast=int),
+            'expiry': config('CHANNEL_LAYER_EXPIRY', default=60, cast=int),
+            'group_expiry': config('CHANNEL_LAYER_GROUP_EXPIRY', default=86400, cast=int),
+        })
 
 # Logging
 LOGGING = {
@@ -5,4 +5,7 @@ from django.apps import AppConfig
 
 class SensorsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'sensors'
\ No newline at end of file
+    name = 'sensors'
+    
+    def ready(self):
+        import sensors.signals
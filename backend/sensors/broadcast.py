@@ -0,0 +1,198 @@
+"""
+Process-wide sensor broadcaster for ``ws/sensors/``
+
+One producer per process reads the newest sensor readings every
+``SENSOR_BROADCAST_INTERVAL`` seconds (the latest per sensor type and
+device) and publishes them once to the ``sensors`` channel-layer group and
+to the filter groups of ``sensors.subscriptions`` (per device, sensor type
+and grid cell) that SensorConsumers join, with each group's frame encoded
+once (``sensors.fanout``). Database load and encoding no longer depend on
+how many dashboards are connected.
+
+Readings come from whatever has been ingested into SensorReading. With
+``SENSOR_SIMULATOR`` set, the producer also inserts one simulated sound,
+vibration and GPS reading per tick, as each connection used to.
+
+With the in-memory channel layer the producer starts with the first
+consumer in the process and stops after the last one disconnects. A shared
+layer (Redis) reaches the consumers of every ASGI worker, so a producer per
+worker would send each frame once per worker and simulate once per worker:
+there, consumers never start it, and exactly one ``run_feed_producers``
+process runs it instead.
+"""
+import asyncio
+import random
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from .models import SensorReading
+from .fanout import encode
+from .subscriptions import route
+
+SENSORS_GROUP = 'sensors'
+
+# Newest readings considered per tick; only the latest per type and device is sent
+MAX_READINGS_PER_TICK = 500
+
+
+def runs_in_process():
+    """Whether consumers start the feed producers themselves (in-memory layer only)"""
+    return settings.CHANNEL_LAYER_BACKEND == 'memory'
+
+
+def latest_readings(after_id=None):
+    """
+    Newest reading id and the latest payload per (sensor type, device) among
+    the newest MAX_READINGS_PER_TICK readings, only those after ``after_id``
+    if given
+    """
+    readings = SensorReading.objects.order_by('-id')
+    if after_id is not None:
+        readings = readings.filter(id__gt=after_id)
+
+    last_id = after_id or 0
+    latest = {}
+    for reading in readings[:MAX_READINGS_PER_TICK]:
+        last_id = max(last_id, reading.id)
+        latest.setdefault((reading.sensor_type, reading.device_id), reading_payload(reading))
+    return last_id, latest
+
+
+def reading_payload(reading):
+    if reading.sensor_type == 'gps':
+        return {
+            'id': reading.id,
+            'sensor_type': reading.sensor_type,
+            'device_id': reading.device_id,
+            'latitude': reading.latitude,
+            'longitude': reading.longitude,
+            'timestamp': reading.timestamp.isoformat(),
+            'active': reading.value > 0,
+        }
+    return {
+        'id': reading.id,
+        'sensor_type': reading.sensor_type,
+        'device_id': reading.device_id,
+        'value': reading.value,
+        'unit': reading.unit,
+        'timestamp': reading.timestamp.isoformat(),
+        'location': {
+            'lat': reading.latitude,
+            'lng': reading.longitude
+        }
+    }
+
+
+def sensor_update(readings):
+    """The ``sensor_update`` frame: the latest of the readings for each sensor type"""
+    data = {}
+    for reading in readings:
+        current = data.get(reading['sensor_type'])
+        if current is None or current['id'] < reading['id']:
+            data[reading['sensor_type']] = reading
+    return {'type': 'sensor_update', 'data': data}
+
+
+def simulate_readings():
+    """Save one simulated sound, vibration and GPS reading"""
+    # Sound sensor (30-120 dB)
+    sound_value = random.uniform(30, 120)
+    if random.random() < 0.1:  # 10% chance of shot detection
+        sound_value = random.uniform(90, 120)
+
+    # Vibration sensor (0-100 Hz)
+    vibration_value = random.uniform(0, 100)
+    if sound_value > 90:  # Correlate with sound
+        vibration_value = random.uniform(40, 100)
+
+    common = {'location_name': 'Hunting Zone A'}
+    for sensor_type, value, unit, device_id, jitter in [
+        ('sound', round(sound_value, 1), 'dB', 'sound_sensor_01', 0.001),
+        ('vibration', round(vibration_value, 1), 'Hz', 'vibration_sensor_01', 0.001),
+        ('gps', 1.0, 'status', 'gps_sensor_01', 0.0001),  # GPS active indicator
+    ]:
+        SensorReading.objects.create(
+            sensor_type=sensor_type,
+            value=value,
+            unit=unit,
+            latitude=40.7128 + random.uniform(-jitter, jitter),
+            longitude=-74.0060 + random.uniform(-jitter, jitter),
+            device_id=device_id,
+            battery_level=random.uniform(20, 100),
+            signal_strength=random.uniform(70, 100),
+            **common
+        )
+
+
+class SensorBroadcaster:
+    """
+    Single periodic producer publishing sensor updates to SENSORS_GROUP
+    """
+
+    def __init__(self):
+        self.subscribers = 0
+        self.last_id = None
+        self.latest = {}  # (sensor type, device id) -> last published reading, for new subscribers
+        self._task = None
+        self.stats = {'ticks': 0, 'published': 0, 'simulated': 0, 'errors': 0}
+
+    def acquire(self):
+        """Register a subscriber; starts the producer in the running loop if it runs in-process"""
+        self.subscribers += 1
+        if runs_in_process() and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def release(self):
+        self.subscribers = max(0, self.subscribers - 1)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def snapshot(self):
+        """Latest reading per sensor type and device, for a new subscriber"""
+        if runs_in_process():
+            return list(self.latest.values())
+        # The producer runs in another process; read the same readings it publishes
+        _, latest = await database_sync_to_async(latest_readings)()
+        return list(latest.values())
+
+    @database_sync_to_async
+    def collect(self):
+        """Latest new reading per sensor type and device, simulating one set first if enabled"""
+        if settings.SENSOR_SIMULATOR:
+            simulate_readings()
+            self.stats['simulated'] += 1
+
+        self.last_id, latest = latest_readings(self.last_id)
+        return latest
+
+    async def publish(self, latest):
+        self.latest.update(latest)
+        channel_layer = get_channel_layer()
+        for group, readings in route(SENSORS_GROUP, list(latest.values())).items():
+            # Encoded once here; subscribers whose filters match every reading send it as is
+            await channel_layer.group_send(group, {
+                'type': 'sensor.update',
+                'readings': readings,
+                'frame': encode(sensor_update(readings)),
+            })
+            self.stats['published'] += 1
+
+    async def run(self):
+        """Publish every SENSOR_BROADCAST_INTERVAL seconds until cancelled"""
+        try:
+            while True:
+                self.stats['ticks'] += 1
+                try:
+                    latest = await self.collect()
+                    if latest:
+                        await self.publish(latest)
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    print(f"Error broadcasting sensor data: {e}")
+                await asyncio.sleep(settings.SENSOR_BROADCAST_INTERVAL)
+        except asyncio.CancelledError:
+            pass
+
+
+sensor_broadcaster = SensorBroadcaster()
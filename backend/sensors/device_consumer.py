@@ -0,0 +1,169 @@
+"""
+WebSocket consumer for always-connected gun devices
+
+Devices keep one connection open on ``ws/devices/<device_id>/`` and push
+shot and status frames over it instead of issuing an HTTP request per event.
+Shots are buffered and written through the same bulk ingestion path as
+``POST /api/hunters/shots/bulk/``; each flush is acknowledged with one frame.
+
+Shots must carry an ``event_id``. Shots still buffered when the connection
+drops are stored without an ack, and the device resends them: the event id
+is what turns those resends into duplicates instead of new shots. Shots
+without one are nacked. A batch that cannot be stored (database errors)
+is answered with one ``nack`` frame listing its ``event_ids``, for the
+device to resend.
+
+Frames (a single object or a list of objects):
+
+    {"type": "shot", "event_id": "...", "sound_level": 140.2,
+     "vibration_level": 22.1, "latitude": 40.71, "longitude": -74.0}
+    {"type": "status", "battery_level": 87, "firmware_version": "1.0.1"}
+"""
+import asyncio
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from hunters.models import Gun
+from hunters.serializers import ShotIngestSerializer
+from hunters.ingest import ingest_shots, clean_device_status
+from hunters.registry import registry
+
+
+class DeviceIngestConsumer(AsyncJsonWebsocketConsumer):
+    """
+    WebSocket consumer that ingests shots and status updates from one device
+    """
+
+    async def connect(self):
+        """Accept the connection only for registered devices"""
+        self.device_id = self.scope['url_route']['kwargs']['device_id']
+        self.gun_id = await self.get_gun_id()
+
+        if self.gun_id is None:
+            await self.close(code=4404)
+            return
+
+        await self.accept()
+
+        self.pending_shots = []
+        self.pending_status = {}
+        self.flush_lock = asyncio.Lock()
+        self.flush_task = asyncio.create_task(self.flush_periodically())
+
+    async def disconnect(self, close_code):
+        """Persist whatever is still buffered; the device resends these unacked shots by event_id"""
+        if hasattr(self, 'flush_task'):
+            self.flush_task.cancel()
+            await self.flush(send_ack=False)
+
+    async def receive_json(self, content, **kwargs):
+        """Buffer incoming frames and flush once a full batch is pending"""
+        frames = content if isinstance(content, list) else [content]
+
+        for frame in frames:
+            if not isinstance(frame, dict):
+                await self.send_json({'type': 'error', 'error': 'Frames must be objects'})
+                continue
+
+            frame_type = frame.get('type')
+            if frame_type == 'shot':
+                await self.buffer_shot(frame)
+            elif frame_type == 'status':
+                await self.buffer_status(frame)
+            else:
+                await self.send_json({
+                    'type': 'error',
+                    'event_id': frame.get('event_id'),
+                    'error': f'Unknown frame type: {frame_type}'
+                })
+
+        if len(self.pending_shots) >= settings.DEVICE_WS_BATCH_SIZE:
+            await self.flush()
+
+    async def buffer_shot(self, frame):
+        shot = dict(frame, gun=self.gun_id)
+        shot.pop('type')
+
+        # Unacked shots are resent by the device; only event ids make that safe
+        if not shot.get('event_id'):
+            await self.send_json({
+                'type': 'nack',
+                'event_id': None,
+                'errors': {'event_id': ['This field is required.']}
+            })
+            return
+
+        # Validate up front so one bad frame cannot reject the whole batch
+        serializer = ShotIngestSerializer(data=shot)
+        if not serializer.is_valid():
+            await self.send_json({
+                'type': 'nack',
+                'event_id': frame.get('event_id'),
+                'errors': serializer.errors
+            })
+            return
+
+        self.pending_shots.append(shot)
+
+    async def buffer_status(self, frame):
+        # Only the latest value of each field matters
+        self.pending_status.update(clean_device_status(frame))
+
+    async def flush_periodically(self):
+        """Flush buffered frames at a fixed interval"""
+        try:
+            while True:
+                await asyncio.sleep(settings.DEVICE_WS_FLUSH_INTERVAL)
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
+
+    async def flush(self, send_ack=True):
+        """Write buffered shots and status, then acknowledge them in one frame"""
+        async with self.flush_lock:
+            shots, self.pending_shots = self.pending_shots, []
+            device_status, self.pending_status = self.pending_status, {}
+
+            if device_status:
+                try:
+                    await self.save_status(device_status)
+                except Exception as e:
+                    print(f"Error saving status of device {self.device_id}: {e}")
+
+            if not shots:
+                return
+
+            try:
+                result = await database_sync_to_async(ingest_shots)(shots)
+            except Exception as e:
+                # Nothing was stored; the device resends the nacked shots
+                print(f"Error storing {len(shots)} shots from device {self.device_id}: {e}")
+                if send_ack:
+                    await self.send_json({
+                        'type': 'nack',
+                        'event_ids': [shot['event_id'] for shot in shots],
+                        'errors': {'non_field_errors': ['Shots could not be stored; resend them']},
+                    })
+                return
+
+            if send_ack:
+                await self.send_json({
+                    'type': 'ack',
+                    'created': [
+                        {'id': shot.id, 'event_id': shot.event_id}
+                        for shot in result['shots']
+                    ],
+                    'duplicates': [item['event_id'] for item in result['duplicates']],
+                    'errors': result['errors'],
+                })
+
+    @database_sync_to_async
+    def get_gun_id(self):
+        record = registry.get_device(self.device_id)
+        return record.gun_id if record else None
+
+    @database_sync_to_async
+    def save_status(self, device_status):
+        """Update only the device columns that changed"""
+        Gun.objects.filter(pk=self.gun_id).update(last_sync=timezone.now(), **device_status)
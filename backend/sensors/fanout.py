@@ -0,0 +1,52 @@
+"""
+Serialize-once fan-out for the WebSocket feeds
+
+Publishers encode each outgoing frame once with ``encode`` and put the
+text in the channel-layer message next to the event itself. Consumers
+still filter on the event, but send the pre-encoded text as it is
+(``send_frame``), so JSON encoding costs scale with events rather than
+with events times viewers. ``metrics`` counts encodes against frames sent
+in this process.
+
+Compression (permessage-deflate) is negotiated and applied by the ASGI
+server per connection; ASGI hands it text, so frames are shared as text.
+"""
+import json
+import threading
+
+
+class FanoutMetrics:
+    """
+    Thread-safe counts of frames encoded and sent
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {'encodes': 0, 'sends': 0, 'bytes_sent': 0}
+
+    def add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['sends_per_encode'] = round(stats['sends'] / stats['encodes'], 2) if stats['encodes'] else 0.0
+        return stats
+
+
+metrics = FanoutMetrics()
+
+
+def encode(frame):
+    """JSON text of a frame, counted as one encode"""
+    text = json.dumps(frame)
+    metrics.add(encodes=1)
+    return text
+
+
+async def send_frame(consumer, text):
+    """Send pre-encoded text on a consumer's WebSocket"""
+    await consumer.send(text_data=text)
+    metrics.add(sends=1, bytes_sent=len(text))
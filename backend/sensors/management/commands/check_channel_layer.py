@@ -0,0 +1,169 @@
+"""
+Smoke-test a channel layer with direct sends and group fan-out
+
+Creates channels, spreads them over a few groups, sends messages to each
+group and checks that every member receives all of them in order,
+reporting round-trip latency and delivered messages per second.
+
+By default the configured layer (CHANNEL_LAYERS) is tested. With
+``--spawn-redis N`` the command starts N throwaway ``redis-server``
+processes on free local ports and tests a Redis layer sharded across them
+instead, so the Redis configuration can be exercised without a shared
+Redis deployment.
+"""
+import asyncio
+import shutil
+import socket
+import subprocess
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from channels.layers import get_channel_layer
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+class Command(BaseCommand):
+    help = 'Check that a channel layer delivers direct and group messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default', help='CHANNEL_LAYERS alias to test')
+        parser.add_argument('--channels', type=int, default=50, help='Channels to create')
+        parser.add_argument('--groups', type=int, default=4, help='Groups to spread the channels over')
+        parser.add_argument('--messages', type=int, default=100, help='Messages sent to each group')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Seconds to wait for deliveries')
+        parser.add_argument('--spawn-redis', type=int, default=0, metavar='N',
+                            help='Start N local redis-server processes and test a layer sharded across them')
+        parser.add_argument('--redis-server', default='redis-server', help='redis-server executable for --spawn-redis')
+        parser.add_argument('--backend', choices=['redis', 'redis-pubsub'], default='redis',
+                            help='Layer type for --spawn-redis')
+
+    def handle(self, *args, **options):
+        if min(options['channels'], options['groups'], options['messages']) < 1:
+            raise CommandError('--channels, --groups and --messages must be positive')
+
+        servers = []
+        try:
+            if options['spawn_redis']:
+                hosts = [self.spawn_redis(options['redis_server'], servers) for _ in range(options['spawn_redis'])]
+                backend = settings.CHANNEL_LAYER_BACKENDS[options['backend']]
+                try:
+                    layer = import_string(backend)(hosts=hosts, prefix='check_channel_layer')
+                except ImportError as e:
+                    raise CommandError(f'Cannot load {backend}: {e}')
+                self.stdout.write(f"Testing {backend} sharded across {', '.join(hosts)}")
+            else:
+                layer = get_channel_layer(options['alias'])
+                if layer is None:
+                    raise CommandError(f"No channel layer configured for {options['alias']!r}")
+                self.stdout.write(f'Testing {type(layer).__module__}.{type(layer).__name__} ({options["alias"]})')
+
+            report = asyncio.run(self.exercise(layer, options))
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait(timeout=5)
+
+        self.stdout.write(
+            f"Direct round trip: {report['direct_ms']:.2f} ms\n"
+            f"Group fan-out: {report['delivered']}/{report['expected']} messages to "
+            f"{options['channels']} channels in {report['seconds']:.2f}s "
+            f"({report['delivered'] / max(report['seconds'], 1e-9):.0f} deliveries/s, "
+            f"p50 {report['p50_ms']:.2f} ms, max {report['max_ms']:.2f} ms)"
+        )
+        if report['problems']:
+            raise CommandError('Channel layer check failed:\n' + '\n'.join(report['problems']))
+        self.stdout.write(self.style.SUCCESS('Channel layer OK'))
+
+    def spawn_redis(self, executable, servers):
+        if shutil.which(executable) is None:
+            raise CommandError(f'{executable} not found; install Redis or pass --redis-server')
+        port = free_port()
+        servers.append(subprocess.Popen(
+            [executable, '--port', str(port), '--bind', '127.0.0.1', '--save', '', '--appendonly', 'no'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        if not wait_for_port(port, timeout=5):
+            raise CommandError(f'redis-server did not start on port {port}')
+        return f'redis://127.0.0.1:{port}/0'
+
+    async def exercise(self, layer, options):
+        problems = []
+
+        # Direct send to a single channel
+        channel = await layer.new_channel()
+        started = time.perf_counter()
+        await layer.send(channel, {'type': 'check.direct', 'n': 1})
+        message = await asyncio.wait_for(layer.receive(channel), options['timeout'])
+        direct_ms = (time.perf_counter() - started) * 1000
+        if message.get('n') != 1:
+            problems.append(f'Direct message corrupted: {message!r}')
+
+        # Group fan-out: every member of a group receives each message, in order
+        groups = [f"check_channel_layer_{i}" for i in range(options['groups'])]
+        members = {}
+        for i in range(options['channels']):
+            member = await layer.new_channel()
+            members[member] = groups[i % len(groups)]
+            await layer.group_add(members[member], member)
+
+        messages = options['messages']
+        sent_at = {}
+        latencies = []
+        received = {member: [] for member in members}
+
+        async def drain(member):
+            while len(received[member]) < messages:
+                message = await layer.receive(member)
+                latencies.append(time.perf_counter() - sent_at[(message['group'], message['n'])])
+                received[member].append(message['n'])
+
+        receivers = [asyncio.ensure_future(drain(member)) for member in members]
+        started = time.perf_counter()
+        for n in range(messages):
+            for group in groups:
+                sent_at[(group, n)] = time.perf_counter()
+                await layer.group_send(group, {'type': 'check.group', 'group': group, 'n': n})
+            await asyncio.sleep(0)
+        done, pending = await asyncio.wait(receivers, timeout=options['timeout'])
+        seconds = time.perf_counter() - started
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if task.exception() is not None:
+                problems.append(f'Receive failed: {task.exception()!r}')
+
+        for member, group in members.items():
+            await layer.group_discard(group, member)
+            if received[member] != list(range(messages)):
+                problems.append(
+                    f'{member} in {group} received {len(received[member])}/{messages} messages'
+                    + ('' if len(received[member]) < messages else ' out of order')
+                )
+
+        latencies.sort()
+        return {
+            'direct_ms': direct_ms,
+            'expected': messages * len(members),
+            'delivered': sum(len(values) for values in received.values()),
+            'seconds': seconds,
+            'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+            'problems': problems[:20],
+        }
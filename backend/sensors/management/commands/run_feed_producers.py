@@ -0,0 +1,46 @@
+"""
+Run the WebSocket feed producers for a shared channel layer
+
+With a shared layer (Redis), ASGI workers do not start the sensor
+broadcaster or the shot simulator themselves: each worker would publish
+every frame to the same groups, and simulate its own readings and shots.
+Run exactly one instance of this command next to the workers instead. It
+publishes sensor updates every ``SENSOR_BROADCAST_INTERVAL`` seconds and,
+with ``SHOT_SIMULATOR`` set, records simulated shots. Committed shots are
+published by whichever process commits them and need no producer.
+"""
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from sensors.broadcast import runs_in_process, sensor_broadcaster
+from sensors.shot_consumer import shot_simulator
+from sensors.shot_feed import shot_feed
+
+
+class Command(BaseCommand):
+    help = 'Publish sensor updates and simulated shots to the shared channel layer (run one instance)'
+
+    def handle(self, *args, **options):
+        if runs_in_process():
+            raise CommandError(
+                'The in-memory channel layer is not shared with the ASGI workers, which run '
+                'their own producers; set CHANNEL_REDIS_HOSTS or CHANNEL_LAYER_BACKEND'
+            )
+
+        self.stdout.write(
+            f'Publishing sensor updates every {settings.SENSOR_BROADCAST_INTERVAL}s'
+            + (f', simulating a shot every {settings.SHOT_SIMULATOR_INTERVAL}s' if settings.SHOT_SIMULATOR else '')
+        )
+        try:
+            asyncio.run(self.produce())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            shot_feed.stop()
+            self.stdout.write(f'Stopped; broadcaster stats: {sensor_broadcaster.stats}')
+
+    async def produce(self):
+        producers = [sensor_broadcaster.run()]
+        if settings.SHOT_SIMULATOR:
+            producers.append(shot_simulator.run())
+        await asyncio.gather(*producers)
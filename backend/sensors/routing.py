@@ -4,8 +4,10 @@ Sensors WebSocket routing
 from django.urls import re_path
 from . import consumers
 from .shot_consumer import ShotSimulatorConsumer
+from .device_consumer import DeviceIngestConsumer
 
 websocket_urlpatterns = [
     re_path(r'ws/sensors/$', consumers.SensorConsumer.as_asgi()),
     re_path(r'ws/shots/$', ShotSimulatorConsumer.as_asgi()),
+    re_path(r'ws/devices/(?P<device_id>[\w.-]+)/$', DeviceIngestConsumer.as_asgi()),
 ]
\ No newline at end of file
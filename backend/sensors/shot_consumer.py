@@ -1,98 +1,121 @@
 """
-WebSocket consumer for real-time shot recording simulation
+WebSocket consumer for the live shot feed
+
+Clients of ``ws/shots/`` join the ``shots`` group and receive every
+committed shot from ``sensors.shot_feed``, or only the shots matching the
+``hunter_ids``, ``gun_ids``, ``zone_ids`` and ``bbox`` filters they
+subscribe with (see ``sensors.subscriptions``). With ``SHOT_SIMULATOR`` set, a
+single simulator also records a random shot every
+``SHOT_SIMULATOR_INTERVAL`` seconds; those shots reach clients through the
+feed like any other. With the in-memory channel layer it runs in-process
+while any client is connected; with a shared layer it runs only in the
+``run_feed_producers`` process, so workers do not each simulate shots.
 """
-import json
 import asyncio
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.utils import timezone
-from hunters.models import Gun, Shot
+from django.conf import settings
+from hunters.models import Shot
+from hunters.registry import registry
+from hunters import last_seen
+from .broadcast import runs_in_process
+from .fanout import send_frame
+from .shot_feed import shot_feed, SHOTS_GROUP
+from .subscriptions import FilteredFeedMixin, Subscription
 import random
 
 
-class ShotSimulatorConsumer(AsyncWebsocketConsumer):
+def create_random_shot():
+    """Create a random shot record"""
+    # Get active guns from the device registry
+    active_guns = registry.active_guns()
+    
+    if not active_guns:
+        return None
+    
+    # Select random gun
+    gun = random.choice(active_guns).to_gun()
+    
+    # Generate realistic shot data
+    shot = Shot.objects.create(
+        gun=gun,
+        sound_level=random.uniform(85, 120),  # Realistic gunshot sound levels
+        vibration_level=random.uniform(40, 80),  # Vibration from recoil
+        latitude=gun.owner.latitude + random.uniform(-0.01, 0.01) if gun.owner.latitude else 40.7128 + random.uniform(-0.01, 0.01),
+        longitude=gun.owner.longitude + random.uniform(-0.01, 0.01) if gun.owner.longitude else -74.0060 + random.uniform(-0.01, 0.01),
+        notes=random.choice([
+            'Auto-simulated shot',
+            'Training exercise',
+            'Target practice',
+            'Field test',
+            'Calibration shot'
+        ])
+    )
+    
+    # Update gun's last_used and owner's last_active (write-behind)
+    last_seen.touch(gun)
+    
+    return shot
+
+
+class ShotSimulator:
     """
-    WebSocket consumer for simulating automatic shot recording
+    Single opt-in producer of random shots, running while clients are connected
     """
+
+    def __init__(self):
+        self.subscribers = 0
+        self._task = None
+
+    def acquire(self):
+        self.subscribers += 1
+        if runs_in_process() and settings.SHOT_SIMULATOR and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def release(self):
+        self.subscribers = max(0, self.subscribers - 1)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self):
+        """Record a random shot every SHOT_SIMULATOR_INTERVAL seconds until cancelled"""
+        try:
+            while True:
+                try:
+                    await database_sync_to_async(create_random_shot)()
+                except Exception as e:
+                    print(f"Error simulating shot: {e}")
+                await asyncio.sleep(settings.SHOT_SIMULATOR_INTERVAL)
+        except asyncio.CancelledError:
+            pass
+
+
+shot_simulator = ShotSimulator()
+
+
+class ShotSimulatorConsumer(FilteredFeedMixin, AsyncWebsocketConsumer):
+    """
+    WebSocket consumer pushing new shots to the dashboard
+    """
+    feed = SHOTS_GROUP
     
     async def connect(self):
-        """Accept WebSocket connection"""
+        """Accept WebSocket connection and join the whole shot feed"""
+        await self.join_feed(Subscription(self.feed))
         await self.accept()
-        
-        # Start shot simulation
-        self.shot_task = asyncio.create_task(self.simulate_shots())
+        self.subscribed = True
+        shot_feed.attach_loop(asyncio.get_running_loop())
+        shot_simulator.acquire()
     
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
-        if hasattr(self, 'shot_task'):
-            self.shot_task.cancel()
-    
-    async def simulate_shots(self):
-        """Simulate shots every 10 seconds"""
-        try:
-            while True:
-                # Generate and record a shot
-                shot_data = await self.create_random_shot()
-                
-                if shot_data:
-                    # Send shot data to WebSocket
-                    await self.send(text_data=json.dumps({
-                        'type': 'new_shot',
-                        'shot': shot_data
-                    }))
-                
-                # Wait 10 seconds before next shot
-                await asyncio.sleep(10)
-                
-        except asyncio.CancelledError:
-            pass
+        await self.leave_feed()
+        if getattr(self, 'subscribed', False):
+            shot_simulator.release()
     
-    @database_sync_to_async
-    def create_random_shot(self):
-        """Create a random shot record"""
-        # Get active guns
-        active_guns = list(Gun.objects.filter(status='active'))
-        
-        if not active_guns:
-            return None
-        
-        # Select random gun
-        gun = random.choice(active_guns)
-        
-        # Generate realistic shot data
-        shot = Shot.objects.create(
-            gun=gun,
-            sound_level=random.uniform(85, 120),  # Realistic gunshot sound levels
-            vibration_level=random.uniform(40, 80),  # Vibration from recoil
-            latitude=gun.owner.latitude + random.uniform(-0.01, 0.01) if gun.owner.latitude else 40.7128 + random.uniform(-0.01, 0.01),
-            longitude=gun.owner.longitude + random.uniform(-0.01, 0.01) if gun.owner.longitude else -74.0060 + random.uniform(-0.01, 0.01),
-            notes=random.choice([
-                'Auto-simulated shot',
-                'Training exercise',
-                'Target practice',
-                'Field test',
-                'Calibration shot'
-            ])
-        )
-        
-        # Update gun's last_used time
-        gun.last_used = timezone.now()
-        gun.save()
-        
-        # Update owner's last_active time
-        gun.owner.last_active = timezone.now()
-        gun.owner.save()
-        
-        return {
-            'id': shot.id,
-            'gun_device_id': gun.device_id,
-            'hunter_name': gun.owner.name,
-            'timestamp': shot.timestamp.isoformat(),
-            'location': shot.location,
-            'sound_level': round(shot.sound_level, 1),
-            'vibration_level': round(shot.vibration_level, 1),
-            'latitude': shot.latitude,
-            'longitude': shot.longitude,
-            'weapon_used': gun.weapon_type,
-            'notes': shot.notes
-        }
\ No newline at end of file
+    async def shots_batch(self, event):
+        """Forward the subscribed shots of a committed batch, one frame per shot"""
+        for shot, frame in zip(event['shots'], event['frames']):
+            if self.wants(shot):
+                await send_frame(self, frame)
@@ -0,0 +1,167 @@
+"""
+Push feed of committed shots for ``ws/shots/``
+
+Shot signals hand new shots to the feed once their transaction commits
+(see ``sensors.signals``), whichever path created them: the REST API, bulk
+ingestion, the device WebSocket or the simulator. Payloads are buffered
+and a background thread publishes them every ``SHOT_FEED_FLUSH_INTERVAL``
+seconds as one ``shots.batch`` message to the ``shots`` channel-layer
+group and to the filter groups of ``sensors.subscriptions`` (per hunter,
+gun, zone and grid cell) that ShotSimulatorConsumers join, with each
+shot's frame encoded once (``sensors.fanout``). Gun and owner details come
+from the device registry and zones from the zone index, so building
+payloads needs no queries.
+
+Consumers register their event loop with the feed, and messages are sent
+on that loop when it is running: the in-memory channel layer only wakes
+receivers correctly from their own loop.
+"""
+import asyncio
+import atexit
+import threading
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from compliance.zone_index import zone_index
+from hunters.registry import registry
+from .fanout import encode
+from .subscriptions import route
+
+SHOTS_GROUP = 'shots'
+
+
+def shot_payload(shot, record=None):
+    """The ``new_shot`` payload the dashboard renders"""
+    if record is not None:
+        device_id, owner_id, owner_name, weapon_type = (
+            record.device_id, record.owner_id, record.owner_name, record.weapon_type
+        )
+    else:
+        gun = shot.gun
+        device_id, owner_id, owner_name, weapon_type = gun.device_id, gun.owner_id, gun.owner.name, gun.weapon_type
+    return {
+        'id': shot.id,
+        'gun_id': shot.gun_id,
+        'gun_device_id': device_id,
+        'hunter_id': owner_id,
+        'hunter_name': owner_name,
+        'timestamp': shot.timestamp.isoformat(),
+        'location': shot.location,
+        'sound_level': round(shot.sound_level, 1),
+        'vibration_level': round(shot.vibration_level, 1),
+        'latitude': shot.latitude,
+        'longitude': shot.longitude,
+        'weapon_used': weapon_type,
+        'notes': shot.notes,
+        'zone_ids': [indexed.zone.id for indexed in zone_index.matches(shot.latitude, shot.longitude)],
+    }
+
+
+class ShotFeed:
+    """
+    Buffer of committed shot payloads published in batches to SHOTS_GROUP
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending = []
+        self._loop = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.stats = {'shots': 0, 'batches': 0, 'errors': 0}
+
+    def get_interval(self):
+        if self.interval is not None:
+            return self.interval
+        return settings.SHOT_FEED_FLUSH_INTERVAL
+
+    def attach_loop(self, loop):
+        """Send on ``loop`` (the ASGI server's event loop) while it runs"""
+        self._loop = loop
+
+    def send(self, group, message):
+        channel_layer = get_channel_layer()
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                future = asyncio.run_coroutine_threadsafe(channel_layer.group_send(group, message), loop)
+                return future.result()
+        async_to_sync(channel_layer.group_send)(group, message)
+
+    def publish(self, shots):
+        """Queue committed shots for the feed"""
+        records = registry.by_gun_ids({shot.gun_id for shot in shots})
+        payloads = [shot_payload(shot, records.get(shot.gun_id)) for shot in shots]
+        with self._lock:
+            self._pending.extend(payloads)
+
+        if self.get_interval() <= 0:
+            # Publish straight away when batching is disabled
+            self.flush()
+        else:
+            self._ensure_started()
+
+    def flush(self):
+        """Send pending payloads to their groups, at most SHOT_FEED_MAX_BATCH per message"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        batch_size = max(1, settings.SHOT_FEED_MAX_BATCH)
+        frames = {}  # Shot id -> its new_shot frame, encoded once for every group
+        for group, shots in route(SHOTS_GROUP, pending).items():
+            for start in range(0, len(shots), batch_size):
+                batch = shots[start:start + batch_size]
+                for shot in batch:
+                    if shot['id'] not in frames:
+                        frames[shot['id']] = encode({'type': 'new_shot', 'shot': shot})
+                self.send(group, {
+                    'type': 'shots.batch',
+                    'shots': batch,
+                    'frames': [frames[shot['id']] for shot in batch],
+                })
+                self.stats['batches'] += 1
+        self.stats['shots'] += len(pending)
+        return len(pending)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='shot-feed-publisher', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.get_interval()):
+            try:
+                self.flush()
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Error publishing shot feed: {e}")
+
+    def stop(self):
+        """Stop the background publisher and send whatever is pending"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.get_interval() + 1)
+        self.flush()
+
+
+shot_feed = ShotFeed()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        shot_feed.flush()
+    except Exception:
+        pass
@@ -0,0 +1,19 @@
+"""
+Sensors app signals
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from hunters.models import Shot
+from hunters.signals import shots_ingested
+from .shot_feed import shot_feed
+
+@receiver(post_save, sender=Shot)
+def feed_shot(sender, instance, created, **kwargs):
+    """Push new shots to ws/shots/ subscribers once they are committed"""
+    if created:
+        transaction.on_commit(lambda: shot_feed.publish([instance]))
+
+@receiver(shots_ingested, sender=Shot)
+def feed_batch(sender, shots, **kwargs):
+    transaction.on_commit(lambda: shot_feed.publish(shots))
@@ -0,0 +1,279 @@
+"""
+Server-side subscription filters for the ``ws/shots/`` and ``ws/sensors/`` feeds
+
+Besides the feed-wide group (``shots``, ``sensors``), every event is
+published to one group per filter key it carries: ``shots.hunter.<id>``,
+``shots.gun.<id>``, ``shots.zone.<id>``, ``sensors.device.<id>``,
+``sensors.type.<type>`` and ``<feed>.cell.<row>_<col>`` for its grid cell
+of ``FEED_CELL_DEGREES``. A client narrows its feed by sending
+
+    {"type": "subscribe", "filters": {"hunter_ids": [3], "bbox": [44.0, 2.0, 46.5, 4.0]}}
+
+and the consumer joins only the groups of the most selective dimension it
+filtered on, so other events never reach it. The full filter is then
+applied to each event (values within a dimension are alternatives,
+dimensions must all match), and events that arrive through several groups
+are sent once. ``{"type": "unsubscribe"}`` restores the whole feed.
+
+The SubscriptionIndex counts this process's subscribers per group. With
+the in-memory channel layer, publishers use it to skip groups nobody
+listens to; with a shared layer the subscribers may be in other processes,
+so every group of an event is published.
+"""
+import json
+import math
+import re
+import threading
+from collections import Counter, deque
+from django.conf import settings
+
+# (filter name, group dimension, event field), most selective first
+DIMENSIONS = {
+    'shots': [
+        ('gun_ids', 'gun', 'gun_id'),
+        ('hunter_ids', 'hunter', 'hunter_id'),
+        ('zone_ids', 'zone', 'zone_ids'),
+    ],
+    'sensors': [
+        ('device_ids', 'device', 'device_id'),
+        ('sensor_types', 'type', 'sensor_type'),
+    ],
+}
+
+# Filters on database ids, which events carry as integers
+NUMERIC_FILTERS = {'gun_ids', 'hunter_ids', 'zone_ids'}
+
+# Larger bounding boxes join the feed-wide group and filter locally
+MAX_CELL_GROUPS = 64
+# Event ids remembered per connection to drop repeats from overlapping groups
+RECENT_EVENTS = 1000
+
+INVALID_GROUP_CHARS = re.compile(r'[^\w.-]')
+
+
+def group_name(feed, dimension, key):
+    """Valid channel-layer group name; distinct keys may share a group"""
+    return f'{feed}.{dimension}.{INVALID_GROUP_CHARS.sub("_", str(key))}'[:99]
+
+
+def cell(latitude, longitude):
+    size = settings.FEED_CELL_DEGREES
+    return math.floor(latitude / size), math.floor(longitude / size)
+
+
+def event_position(event):
+    """(lat, lng) of a shot or sensor reading payload, or None"""
+    latitude = event.get('latitude')
+    longitude = event.get('longitude')
+    if latitude is None and isinstance(event.get('location'), dict):
+        latitude, longitude = event['location'].get('lat'), event['location'].get('lng')
+    if latitude is None or longitude is None:
+        return None
+    return latitude, longitude
+
+
+def event_groups(feed, event):
+    """Every group an event is published to"""
+    groups = [feed]
+    for _, dimension, field in DIMENSIONS[feed]:
+        value = event.get(field)
+        for key in (value if isinstance(value, list) else [value]):
+            if key is not None:
+                groups.append(group_name(feed, dimension, key))
+    position = event_position(event)
+    if position is not None:
+        row, col = cell(*position)
+        groups.append(group_name(feed, 'cell', f'{row}_{col}'))
+    return groups
+
+
+def route(feed, events):
+    """Group name -> the events to publish to it, for groups worth sending to"""
+    routed = {}
+    for event in events:
+        for group in event_groups(feed, event):
+            routed.setdefault(group, []).append(event)
+    return {group: batch for group, batch in routed.items() if subscriptions.wanted(group)}
+
+
+class Subscription:
+    """
+    Parsed filters of one connection; no filters means the whole feed
+    """
+
+    def __init__(self, feed, filters=None):
+        self.feed = feed
+        self.values = {}
+        self.bbox = None
+        filters = filters or {}
+        if not isinstance(filters, dict):
+            raise ValueError('filters must be an object')
+
+        known = {name for name, _, _ in DIMENSIONS[feed]} | {'bbox'}
+        unknown = set(filters) - known
+        if unknown:
+            raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}; expected {', '.join(sorted(known))}")
+
+        for name, _, _ in DIMENSIONS[feed]:
+            values = filters.get(name)
+            if values in (None, []):
+                continue
+            if not isinstance(values, list) or not all(isinstance(v, (int, str)) for v in values):
+                raise ValueError(f'{name} must be a list of ids')
+            if name in NUMERIC_FILTERS:
+                try:
+                    values = [int(v) for v in values]
+                except ValueError:
+                    raise ValueError(f'{name} must be a list of integer ids')
+            self.values[name] = set(values)
+
+        bbox = filters.get('bbox')
+        if bbox is not None:
+            if (not isinstance(bbox, list) or len(bbox) != 4
+                    or not all(isinstance(v, (int, float)) for v in bbox)):
+                raise ValueError('bbox must be [min_lat, min_lng, max_lat, max_lng]')
+            if bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+                raise ValueError('bbox minimums must not exceed its maximums')
+            self.bbox = tuple(bbox)
+
+    def as_dict(self):
+        filters = {name: sorted(values, key=str) for name, values in self.values.items()}
+        if self.bbox is not None:
+            filters['bbox'] = list(self.bbox)
+        return filters
+
+    def groups(self):
+        """Groups to join: the most selective filtered dimension, else the box's cells"""
+        for name, dimension, _ in DIMENSIONS[self.feed]:
+            if name in self.values:
+                return sorted({group_name(self.feed, dimension, key) for key in self.values[name]})
+        if self.bbox is not None:
+            min_row, min_col = cell(self.bbox[0], self.bbox[1])
+            max_row, max_col = cell(self.bbox[2], self.bbox[3])
+            if (max_row - min_row + 1) * (max_col - min_col + 1) <= MAX_CELL_GROUPS:
+                return [
+                    group_name(self.feed, 'cell', f'{row}_{col}')
+                    for row in range(min_row, max_row + 1)
+                    for col in range(min_col, max_col + 1)
+                ]
+        return [self.feed]
+
+    def matches(self, event):
+        for name, _, field in DIMENSIONS[self.feed]:
+            if name not in self.values:
+                continue
+            value = event.get(field)
+            keys = value if isinstance(value, list) else [value]
+            if not self.values[name].intersection(keys):
+                return False
+        if self.bbox is not None:
+            position = event_position(event)
+            if position is None:
+                return False
+            min_lat, min_lng, max_lat, max_lng = self.bbox
+            if not (min_lat <= position[0] <= max_lat and min_lng <= position[1] <= max_lng):
+                return False
+        return True
+
+
+class SubscriptionIndex:
+    """
+    Thread-safe count of this process's subscribers per group
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def add(self, groups):
+        with self._lock:
+            self._counts.update(groups)
+
+    def remove(self, groups):
+        with self._lock:
+            self._counts.subtract(groups)
+            for group in groups:
+                if self._counts[group] <= 0:
+                    del self._counts[group]
+
+    def wanted(self, group):
+        """Whether publishing to ``group`` can reach anyone"""
+        if settings.CHANNEL_LAYER_BACKEND != 'memory':
+            return True
+        with self._lock:
+            return self._counts[group] > 0
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+subscriptions = SubscriptionIndex()
+
+
+class FilteredFeedMixin:
+    """
+    Subscribe/unsubscribe handling for a feed consumer (AsyncWebsocketConsumer)
+    """
+    feed = None
+
+    async def join_feed(self, subscription):
+        """Move this connection's group memberships to ``subscription``"""
+        old_groups = getattr(self, 'feed_groups', [])
+        new_groups = subscription.groups()
+        for group in set(old_groups) - set(new_groups):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        for group in set(new_groups) - set(old_groups):
+            await self.channel_layer.group_add(group, self.channel_name)
+        subscriptions.remove(old_groups)
+        subscriptions.add(new_groups)
+        self.subscription = subscription
+        self.feed_groups = new_groups
+        self.recent_ids = deque(maxlen=RECENT_EVENTS)
+        self.recent_set = set()
+
+    async def leave_feed(self):
+        for group in getattr(self, 'feed_groups', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        subscriptions.remove(getattr(self, 'feed_groups', []))
+        self.feed_groups = []
+
+    async def receive(self, text_data=None, bytes_data=None):
+        """Handle subscribe / unsubscribe messages"""
+        try:
+            message = json.loads(text_data or '')
+        except ValueError:
+            message = None
+        if not isinstance(message, dict) or message.get('type') not in ('subscribe', 'unsubscribe'):
+            await self.send(text_data=json.dumps({
+                'type': 'error', 'error': 'Expected {"type": "subscribe", "filters": {...}} or {"type": "unsubscribe"}'
+            }))
+            return
+
+        try:
+            filters = message.get('filters') if message['type'] == 'subscribe' else None
+            subscription = Subscription(self.feed, filters)
+        except ValueError as e:
+            await self.send(text_data=json.dumps({'type': 'error', 'error': str(e)}))
+            return
+        await self.join_feed(subscription)
+        await self.send(text_data=json.dumps({'type': 'subscribed', 'filters': subscription.as_dict()}))
+        await self.subscription_changed()
+
+    async def subscription_changed(self):
+        """Called after a subscribe / unsubscribe has been acknowledged"""
+
+    def wants(self, event):
+        """Whether to send an event: it matches the filters and was not sent already"""
+        if not self.subscription.matches(event):
+            return False
+        event_id = event.get('id')
+        if event_id is None or len(self.feed_groups) == 1:
+            return True
+        if event_id in self.recent_set:
+            return False
+        if len(self.recent_ids) == self.recent_ids.maxlen:
+            self.recent_set.discard(self.recent_ids[0])
+        self.recent_ids.append(event_id)
+        self.recent_set.add(event_id)
+        return True
@@ -56,7 +56,23 @@ class SensorReadingViewSet(viewsets.ModelViewSet):
         anomalies = SensorReading.objects.filter(is_anomaly=True)
         serializer = self.get_serializer(anomalies, many=True)
         return Response(serializer.data)
-    
+
+    @action(detail=False, methods=['get'])
+    def feed_stats(self, request):
+        """
+        Get WebSocket feed fan-out counters for this process
+        """
+        from .broadcast import sensor_broadcaster
+        from .fanout import metrics
+        from .shot_feed import shot_feed
+        from .subscriptions import subscriptions
+        return Response({
+            'fanout': metrics.snapshot(),
+            'shot_feed': dict(shot_feed.stats),
+            'sensor_broadcaster': dict(sensor_broadcaster.stats, subscribers=sensor_broadcaster.subscribers),
+            'group_subscribers': subscriptions.stats(),
+        })
+
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """
@@ -9,7 +9,11 @@ import json
 import time
 import random
 import threading
-from datetime import datetime
+import uuid
+import sqlite3
+import argparse
+import asyncio
+from datetime import datetime, timezone
 import logging
 import sys
 import os
@@ -26,6 +30,15 @@ FIRMWARE_VERSION = "1.0.0"
 SHOT_PROBABILITY = 0.1  # 10% chance per check interval
 CHECK_INTERVAL = 5  # Check every 5 seconds
 
+# Store-and-forward: shots are journaled locally and uploaded in batches
+JOURNAL_PATH = "iot_gun_sensor_journal.db"
+UPLOAD_BATCH_SIZE = 100  # Max shots per upload request
+UPLOAD_BATCH_BYTES = 64 * 1024  # Max JSON payload bytes per upload request
+UPLOAD_INTERVAL = 15  # Upload at least this often (seconds) while shots are pending
+UPLOAD_TIMEOUT = 10  # HTTP timeout for uploads (seconds)
+BACKOFF_BASE = 2  # First retry delay after a failed upload (seconds)
+BACKOFF_MAX = 300  # Retry delay cap (seconds)
+
 # GPS coordinates (Forest area simulation)
 BASE_LATITUDE = 40.7128
 BASE_LONGITUDE = -74.0060
@@ -42,6 +55,56 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class OfflineJournal:
+    """Durable local queue of shots waiting to be uploaded (SQLite)"""
+    
+    def __init__(self, path=JOURNAL_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS shots ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " event_id TEXT UNIQUE,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+    
+    def append(self, shot_data):
+        """Persist a shot before any network attempt"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO shots (event_id, payload, created_at) VALUES (?, ?, ?)",
+                (shot_data.get("event_id"), json.dumps(shot_data), time.time())
+            )
+            self.conn.commit()
+    
+    def next_batch(self, max_items=UPLOAD_BATCH_SIZE, max_bytes=UPLOAD_BATCH_BYTES):
+        """Oldest pending shots, limited by count and payload size (always at least one)"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, payload FROM shots ORDER BY id LIMIT ?", (max_items,)
+            ).fetchall()
+        
+        batch = []
+        size = 2  # Enclosing brackets of the JSON list
+        for row_id, payload in rows:
+            size += len(payload) + 1
+            if batch and size > max_bytes:
+                break
+            batch.append((row_id, json.loads(payload)))
+        return batch
+    
+    def remove(self, row_ids):
+        with self.lock:
+            self.conn.executemany("DELETE FROM shots WHERE id = ?", [(i,) for i in row_ids])
+            self.conn.commit()
+    
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM shots").fetchone()[0]
+
 class IoTGunSensor:
     def __init__(self):
         self.device_id = DEVICE_ID
@@ -52,6 +115,9 @@ class IoTGunSensor:
         self.is_running = False
         self.session = requests.Session()
         self.session.timeout = 10
+        self.journal = OfflineJournal()
+        self.upload_wakeup = threading.Event()
+        self.upload_failures = 0
         
     def get_current_location(self):
         """Simulate GPS movement within a small area"""
@@ -161,7 +227,7 @@ class IoTGunSensor:
             return False
     
     def record_shot(self):
-        """Record a shot event with sensor data"""
+        """Record a shot event with sensor data in the local journal"""
         try:
             lat, lng = self.get_current_location()
             
@@ -171,30 +237,89 @@ class IoTGunSensor:
                 "vibration_level": self.simulate_vibration_level(),
                 "latitude": lat,
                 "longitude": lng,
-                "notes": f"Simulated shot from {self.device_id} at {datetime.now().isoformat()}"
+                "notes": f"Simulated shot from {self.device_id} at {datetime.now().isoformat()}",
+                # Reused on retry so the server can drop duplicates
+                "event_id": uuid.uuid4().hex,
+                # Fire time; journaled shots may be uploaded much later
+                "timestamp": datetime.now(timezone.utc).isoformat()
             }
             
-            response = self.session.post(
-                f"{API_BASE_URL}/hunters/shots/",
-                json=shot_data,
-                headers={"Content-Type": "application/json"}
-            )
+            self.journal.append(shot_data)
+            logger.info(f"Shot journaled: {shot_data['event_id']}")
+            logger.info(f"  Sound Level: {shot_data['sound_level']:.1f} dB")
+            logger.info(f"  Vibration: {shot_data['vibration_level']:.1f} Hz")
+            logger.info(f"  Location: {lat:.4f}, {lng:.4f}")
             
-            if response.status_code == 201:
-                shot = response.json()
-                logger.info(f"Shot recorded successfully: ID {shot.get('id', 'unknown')}")
-                logger.info(f"  Sound Level: {shot_data['sound_level']:.1f} dB")
-                logger.info(f"  Vibration: {shot_data['vibration_level']:.1f} Hz")
-                logger.info(f"  Location: {lat:.4f}, {lng:.4f}")
-                return True
-            else:
-                logger.error(f"Failed to record shot: {response.status_code} - {response.text}")
-                return False
+            if len(self.journal) >= UPLOAD_BATCH_SIZE:
+                self.upload_wakeup.set()
+            return True
                 
         except Exception as e:
             logger.error(f"Error recording shot: {e}")
             return False
     
+    def upload_batch(self):
+        """
+        Upload the oldest journaled shots in one bulk request.
+        Returns the number of shots removed from the journal, or None on failure.
+        """
+        batch = self.journal.next_batch()
+        if not batch:
+            return 0
+        
+        row_ids = [row_id for row_id, _ in batch]
+        shots = [shot for _, shot in batch]
+        
+        try:
+            response = self.session.post(
+                f"{API_BASE_URL}/hunters/shots/bulk/",
+                json=shots,
+                headers={"Content-Type": "application/json"},
+                timeout=UPLOAD_TIMEOUT
+            )
+        except Exception as e:
+            logger.warning(f"Upload of {len(shots)} shots failed: {e}")
+            return None
+        
+        if response.status_code == 201:
+            result = response.json()
+            self.journal.remove(row_ids)
+            logger.info(f"Uploaded {result.get('created', 0)} shots "
+                        f"({len(result.get('duplicates', []))} already recorded)")
+            return len(row_ids)
+        
+        if response.status_code == 400:
+            errors = response.json().get('errors') or {}
+            rejected = [row_ids[int(index)] for index in errors if int(index) < len(row_ids)]
+            if rejected:
+                # Invalid shots will never be accepted; drop them so the rest can go through
+                logger.error(f"Dropping {len(rejected)} rejected shots: {errors}")
+                self.journal.remove(rejected)
+                return len(rejected)
+        
+        logger.warning(f"Upload failed: {response.status_code} - {response.text[:200]}")
+        return None
+    
+    def upload_loop(self):
+        """Drain the journal in batches, backing off exponentially while the server is unreachable"""
+        while self.is_running:
+            if self.upload_failures:
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.upload_failures - 1))
+                # Full jitter spreads reconnecting devices over the whole window
+                self.upload_wakeup.wait(random.uniform(0, delay))
+            else:
+                self.upload_wakeup.wait(UPLOAD_INTERVAL)
+            self.upload_wakeup.clear()
+            
+            while self.is_running:
+                uploaded = self.upload_batch()
+                if uploaded is None:
+                    self.upload_failures += 1
+                    break
+                self.upload_failures = 0
+                if uploaded == 0:
+                    break
+    
     def update_device_status(self):
         """Update device battery and sync status"""
         try:
@@ -292,6 +417,14 @@ class IoTGunSensor:
         sensor_thread = threading.Thread(target=self.sensor_loop, daemon=True)
         sensor_thread.start()
         
+        # Start store-and-forward uploader
+        upload_thread = threading.Thread(target=self.upload_loop, daemon=True)
+        upload_thread.start()
+        
+        pending = len(self.journal)
+        if pending:
+            logger.info(f"{pending} journaled shots pending upload")
+        
         logger.info("IoT Gun Sensor is now active and monitoring...")
         logger.info("Press Ctrl+C to stop")
         
@@ -300,14 +433,245 @@ class IoTGunSensor:
         except KeyboardInterrupt:
             logger.info("Shutting down IoT Gun Sensor...")
             self.is_running = False
+            self.upload_wakeup.set()
             
         return True
     
     def stop(self):
         """Stop the IoT gun sensor"""
         self.is_running = False
+        self.upload_wakeup.set()
         logger.info("IoT Gun Sensor stopped")
 
+class FleetDevice(IoTGunSensor):
+    """Lightweight IoTGunSensor for fleet mode: no HTTP session, thread or journal"""
+    
+    def __init__(self, index, hunter_id):
+        self.device_id = f"{DEVICE_ID}-F{index:05d}"
+        self.gun_id = None
+        self.hunter_id = hunter_id
+        self.battery_level = BATTERY_LEVEL
+        self.firmware_version = FIRMWARE_VERSION
+    
+    def shot_payload(self):
+        lat, lng = self.get_current_location()
+        return {
+            "gun": self.gun_id,
+            "sound_level": self.simulate_sound_level(),
+            "vibration_level": self.simulate_vibration_level(),
+            "latitude": lat,
+            "longitude": lng,
+            "notes": f"Fleet simulated shot from {self.device_id}",
+            "event_id": uuid.uuid4().hex
+        }
+    
+    def gun_payload(self):
+        return {
+            "device_id": self.device_id,
+            "serial_number": f"FLEET-SN-{self.device_id}",
+            "make": "Fleet Simulator",
+            "model": "IoT Sensor Gun",
+            "caliber": ".308",
+            "weapon_type": "rifle",
+            "owner": self.hunter_id,
+            "battery_level": self.battery_level,
+            "firmware_version": self.firmware_version,
+            "status": "active",
+            "notes": "Fleet simulation device"
+        }
+
+class FleetSimulator:
+    """
+    Simulates many IoT guns in one asyncio event loop sharing a single
+    HTTP connection pool, and reports latency/throughput per endpoint.
+    """
+    
+    def __init__(self, size, rate, distribution, duration, concurrency, status_probability):
+        self.size = size
+        self.rate = rate  # Shots per device per minute
+        self.distribution = distribution
+        self.duration = duration
+        self.concurrency = concurrency
+        self.status_probability = status_probability
+        self.latencies = {}
+        self.errors = {}
+    
+    def next_delay(self):
+        """Seconds until a device's next shot (or burst) for the chosen distribution"""
+        mean = 60.0 / self.rate
+        if self.distribution == 'uniform':
+            return random.uniform(0.5 * mean, 1.5 * mean)
+        if self.distribution == 'burst':
+            # Bursts of 3-8 shots, so gaps between bursts are proportionally longer
+            return random.expovariate(1.0 / (mean * 5.5))
+        return random.expovariate(1.0 / mean)  # poisson
+    
+    def burst_size(self):
+        return random.randint(3, 8) if self.distribution == 'burst' else 1
+    
+    async def request(self, http, method, endpoint, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            async with http.request(method, url, **kwargs) as response:
+                body = await response.read()
+                ok = response.status < 400
+                status = response.status
+        except Exception as e:
+            body, ok, status = b'', False, type(e).__name__
+        
+        self.latencies.setdefault(endpoint, []).append(time.perf_counter() - started)
+        if not ok:
+            self.errors.setdefault(endpoint, {}).setdefault(status, 0)
+            self.errors[endpoint][status] += 1
+            return None
+        return json.loads(body) if body else {}
+    
+    async def get_all(self, http, url):
+        """Follow DRF pagination and return every result"""
+        results = []
+        while url:
+            data = await self.request(http, 'GET', 'setup', url)
+            if data is None:
+                break
+            if isinstance(data, list):
+                return data
+            results.extend(data.get('results', []))
+            url = data.get('next')
+        return results
+    
+    async def setup(self, http):
+        """Find or create a hunter and register one gun per simulated device"""
+        hunters = await self.request(http, 'GET', 'setup', f"{API_BASE_URL}/hunters/hunters/")
+        if hunters and isinstance(hunters, dict):
+            hunters = hunters.get('results')
+        if hunters:
+            hunter_id = hunters[0]['id']
+        else:
+            hunter = await self.request(http, 'POST', 'setup', f"{API_BASE_URL}/hunters/hunters/", json={
+                "name": "Fleet IoT Hunter",
+                "license_number": f"FLEET-LIC-{random.randint(1000, 9999)}",
+                "current_location": "IoT Testing Zone",
+                "latitude": BASE_LATITUDE,
+                "longitude": BASE_LONGITUDE,
+                "is_active": True
+            })
+            if hunter is None:
+                raise RuntimeError("Could not register fleet hunter")
+            hunter_id = hunter['id']
+        
+        devices = [FleetDevice(index, hunter_id) for index in range(self.size)]
+        existing = {gun['device_id']: gun['id'] for gun in await self.get_all(http, f"{API_BASE_URL}/hunters/guns/")}
+        
+        async def register(device):
+            if device.device_id in existing:
+                device.gun_id = existing[device.device_id]
+                return
+            gun = await self.request(http, 'POST', 'setup', f"{API_BASE_URL}/hunters/guns/", json=device.gun_payload())
+            if gun:
+                device.gun_id = gun['id']
+        
+        await asyncio.gather(*(register(device) for device in devices))
+        return [device for device in devices if device.gun_id]
+    
+    async def sleep_until(self, delay, deadline):
+        await asyncio.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+    
+    async def run_device(self, http, device, deadline):
+        # Stagger start so devices do not fire in lockstep
+        await self.sleep_until(random.uniform(0, self.next_delay()), deadline)
+        while time.monotonic() < deadline:
+            for _ in range(self.burst_size()):
+                await self.request(http, 'POST', 'shot', f"{API_BASE_URL}/hunters/shots/", json=device.shot_payload())
+            
+            if random.random() < self.status_probability:
+                if device.battery_level > 5:
+                    device.battery_level -= random.uniform(0.1, 0.5)
+                await self.request(
+                    http, 'PATCH', 'status',
+                    f"{API_BASE_URL}/hunters/guns/{device.gun_id}/update_device_status/",
+                    json={"battery_level": int(device.battery_level)}
+                )
+            
+            await self.sleep_until(self.next_delay(), deadline)
+    
+    async def run(self):
+        try:
+            import aiohttp
+        except ImportError:
+            raise RuntimeError("Fleet mode requires aiohttp: pip install aiohttp")
+        
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+            devices = await self.setup(http)
+            logger.info(f"Fleet of {len(devices)} devices registered; running for {self.duration}s")
+            
+            self.latencies.pop('setup', None)
+            self.errors.pop('setup', None)
+            started = time.monotonic()
+            deadline = started + self.duration
+            await asyncio.gather(*(self.run_device(http, device, deadline) for device in devices))
+            self.elapsed = time.monotonic() - started
+    
+    def summary(self):
+        """Latency and throughput per endpoint"""
+        lines = [f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'req/s':>8} "
+                 f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        for endpoint, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            
+            def pct(p):
+                return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+            
+            errors = sum(self.errors.get(endpoint, {}).values())
+            lines.append(
+                f"{endpoint:<10} {len(samples):>9} {errors:>7} {len(samples) / self.elapsed:>8.1f} "
+                f"{pct(0.50):>8.1f} {pct(0.95):>8.1f} {pct(0.99):>8.1f} {samples[-1] * 1000:>8.1f}"
+            )
+        for endpoint, statuses in sorted(self.errors.items()):
+            lines.append(f"{endpoint} errors by status: {statuses}")
+        return "\n".join(lines)
+
+def run_fleet(args):
+    simulator = FleetSimulator(
+        size=args.fleet,
+        rate=args.rate,
+        distribution=args.distribution,
+        duration=args.duration,
+        concurrency=args.concurrency,
+        status_probability=args.status_probability,
+    )
+    try:
+        asyncio.run(simulator.run())
+    except KeyboardInterrupt:
+        logger.info("Fleet simulation interrupted")
+        return 1
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+    
+    print("-" * 60)
+    print(f"Fleet: {args.fleet} devices, {args.distribution} shots at {args.rate}/min/device, "
+          f"{simulator.elapsed:.1f}s")
+    print(simulator.summary())
+    return 0
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="IoT gun sensor simulator")
+    parser.add_argument('--fleet', type=int, default=0,
+                        help='Simulate N devices in one asyncio event loop instead of a single Pi device')
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help='Fleet mode: mean shots per device per minute')
+    parser.add_argument('--distribution', choices=['poisson', 'uniform', 'burst'], default='poisson',
+                        help='Fleet mode: shot inter-arrival distribution')
+    parser.add_argument('--duration', type=float, default=60.0,
+                        help='Fleet mode: seconds to run')
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='Fleet mode: size of the shared HTTP connection pool')
+    parser.add_argument('--status-probability', type=float, default=0.2,
+                        help='Fleet mode: chance of a status update after each shot')
+    return parser.parse_args()
+
 def main():
     """Main function"""
     print("=" * 60)
@@ -315,6 +679,13 @@ def main():
     print("Connects to Django Dashboard and simulates gun sensor data")
     print("=" * 60)
     
+    args = parse_args()
+    if args.fleet > 0:
+        print(f"Server URL: {API_BASE_URL}")
+        print(f"Fleet mode: {args.fleet} simulated devices")
+        print("-" * 60)
+        return run_fleet(args)
+    
     # Check if running on Raspberry Pi
     try:
         with open('/proc/cpuinfo', 'r') as f:
@@ -980,7 +980,10 @@ function refreshData() {
     fetchDashboardStats();
     fetchHunters();
     fetchGuns();
-    fetchRecentShots();
+    // New shots are pushed over the WebSocket while it is connected
+    if (!isWebSocketConnected) {
+      fetchRecentShots();
+    }
     fetchAmmunition();
     fetchRecentActivities();
     updateLastRefreshTime();